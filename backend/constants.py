@@ -7,3 +7,9 @@ MIN_COOKING_TIME = 0
 MAX_COOKING_TIME = 1000
 MAX_AMOUNT = 32767
 MIN_AMOUNT = 1
+PAGE_SIZE = 6
+MAX_PAGE_SIZE = 100
+MAX_BATCH_SIZE = 100
+FEED_MAX_LENGTH = 1000
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+MAX_IMAGE_DIMENSION = 6000
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -108,6 +109,26 @@ else:
         }
     }
 
+# Serialized recipe fragments. Each process keeps its own in memory unless
+# CACHE_BACKEND names a shared backend such as
+# django.core.cache.backends.memcached.PyMemcacheCache. The versions the
+# fragments depend on are kept in the database and never evicted.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='foodgram'),
+    },
+}
+if CACHES['default']['BACKEND'].endswith('.LocMemCache'):
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', default='20000')),
+        'CULL_FREQUENCY': 10,
+    }
+
+RECIPE_SEARCH_CONFIG = os.getenv('RECIPE_SEARCH_CONFIG', default='russian')
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -143,3 +164,15 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+DEFAULT_FILE_STORAGE = 'foodgram.storage.ContentAddressedStorage'
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+
+INGREDIENT_INDEX_PATH = os.getenv(
+    'INGREDIENT_INDEX_PATH',
+    default=os.path.join(tempfile.gettempdir(), 'foodgram_ingredients.idx'))
+
+BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', default='2'))
+BACKGROUND_TASKS_EAGER = os.getenv('BACKGROUND_TASKS_EAGER', 'False') == 'True'
@@ -0,0 +1,77 @@
+"""Content-addressed file storage for uploaded media."""
+import fcntl
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage naming files by the SHA-256 of their content.
+
+    A file keeps its directory and extension, but its name is replaced by
+    the digest of its bytes, so uploading the same content twice stores a
+    single file. The names never change meaning, which allows serving them
+    with immutable cache headers.
+
+    Reusing a stored file and deleting an unused one are serialized by a
+    lock shared by every process using the storage.
+    """
+
+    lock_name = '.lock'
+
+    @contextmanager
+    def lock(self):
+        """Hold the exclusive lock of the storage."""
+        os.makedirs(self.location, exist_ok=True)
+        with open(os.path.join(self.location, self.lock_name), 'a') as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+    def content_name(self, name, content):
+        """Return the content-addressed name of a file."""
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest.hexdigest() + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        with self.lock():
+            try:
+                # Reusing a file makes it recent again, so a release of its
+                # previous users waiting for the lock leaves it alone.
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                pass
+        return super().save(name, content, max_length=max_length)
+
+    def get_available_name(self, name, max_length=None):
+        """Keep the name: the same name always holds the same content."""
+        return name
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+            for chunk in content.chunks():
+                file.write(chunk)
+        os.chmod(file.name, self.file_permissions_mode or 0o644)
+        os.replace(file.name, full_path)
+        return name
@@ -0,0 +1,45 @@
+"""Background execution of work scheduled by request handlers."""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_WORKERS,
+            thread_name_prefix='foodgram-task',
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed.', func.__qualname__)
+    finally:
+        connections.close_all()
+
+
+def run(func, *args, **kwargs):
+    """Run func in a worker thread.
+
+    With BACKGROUND_TASKS_EAGER the call is made in the current thread.
+    """
+    if settings.BACKGROUND_TASKS_EAGER:
+        func(*args, **kwargs)
+    else:
+        _get_executor().submit(_run, func, args, kwargs)
+
+
+def run_after_commit(func, *args, **kwargs):
+    """Run func in a worker thread once the current transaction commits."""
+    transaction.on_commit(lambda: run(func, *args, **kwargs))
@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+from foodgram.settings import *  # noqa
+
+if os.getenv('USE_SQLITE', 'True') == 'True':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+MEDIA_ROOT = tempfile.mkdtemp(prefix='foodgram_media_')
+INGREDIENT_INDEX_PATH = os.path.join(tempfile.mkdtemp(), 'ingredients.idx')
+
+BACKGROUND_TASKS_EAGER = True
@@ -1,11 +1,19 @@
 from rest_framework import serializers
 
+from recipes import images
 from recipes.models import Recipe
 
 
 class GenericRecipeSerializer(serializers.ModelSerializer):
     """Serializer for adding a recipe to the shopping cart."""
 
+    image_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
+
+    def get_image_variants(self, obj):
+        """Return the URLs of the ready image variants."""
+        return images.variant_urls(obj.image_variants,
+                                   self.context.get('request'))
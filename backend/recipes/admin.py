@@ -39,6 +39,24 @@ class IngredientsOfRecipeAdmin(admin.ModelAdmin):
     search_fields = ('recipe', 'ingredient', 'amount')
     list_filter = ('ingredient',)
 
+    def save_model(self, request, obj, form, change):
+        """Save the row and refresh the snapshot of its recipe."""
+        super().save_model(request, obj, form, change)
+        obj.recipe.refresh_ingredients_snapshot()
+
+    def delete_model(self, request, obj):
+        """Delete the row and refresh the snapshot of its recipe."""
+        super().delete_model(request, obj)
+        obj.recipe.refresh_ingredients_snapshot()
+
+    def delete_queryset(self, request, queryset):
+        """Delete the rows and refresh the snapshots of their recipes."""
+        recipes = list(Recipe.objects.filter(
+            ingredients_in_recipe__in=queryset).distinct())
+        super().delete_queryset(request, queryset)
+        for recipe in recipes:
+            recipe.refresh_ingredients_snapshot()
+
 
 class RecipeIngredientAdmin(admin.StackedInline):
     """Ingriedients in admin Recipe."""
@@ -54,13 +72,18 @@ class RecipesAdmin(admin.ModelAdmin):
 
     list_display = ('id', 'author',
                     'name', 'text', 'cooking_time',
-                    'favorite_count', 'image',
+                    'favorites_count', 'in_carts_count', 'image',
                     'recipes_tags', 'recipes_ingredients')
     list_filter = ('tags', 'author', 'name')
     search_fields = ('name', 'cooking_time', 'tags__name',
                      'author__email', 'ingredients__name')
     inlines = (RecipeIngredientAdmin,)
 
+    def save_related(self, request, form, formsets, change):
+        """Refresh the ingredients snapshot after the inlines are saved."""
+        super().save_related(request, form, formsets, change)
+        form.instance.refresh_ingredients_snapshot()
+
     @admin.display(description='tags')
     def recipes_tags(self, obj):
         """Return the tags of the recipe."""
@@ -74,11 +97,6 @@ class RecipesAdmin(admin.ModelAdmin):
             for ingredient in obj.ingredients.all()
         )
 
-    @admin.display(description='favorite count')
-    def favorite_count(self, obj):
-        """Return number of times the recipe has been marked as favorite."""
-        return obj.favorite_set.count()
-
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
@@ -0,0 +1,92 @@
+"""Streaming exports of the shopping cart."""
+import csv
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+FILENAME = 'ShoppingCart'
+TITLE = 'Shopping Cart.'
+PDF_FONT = 'ShoppingCartFont'
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 50
+PDF_LINE_HEIGHT = 18
+SPOOL_SIZE = 1024 * 1024
+
+
+def ingredient_name(ingredient):
+    name = ingredient['ingredient__name']
+    return name[:1].upper() + name[1:]
+
+
+def text_lines(ingredients):
+    yield f'{TITLE}\n'
+    for number, ingredient in enumerate(ingredients, start=1):
+        yield (
+            f'{number}) {ingredient_name(ingredient)} - '
+            f'{ingredient["ingredient__measurement_unit"]} '
+            f'({ingredient["amount"]})\n'
+        )
+
+
+class Echo:
+    """File-like object returning what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['ingredient__measurement_unit'],
+            ingredient['amount'],
+        ))
+
+
+def streaming_response(lines, content_type, extension):
+    response = StreamingHttpResponse(
+        lines, content_type=f'{content_type}; charset=utf-8')
+    response['Content-Disposition'] = (
+        f'attachment; filename="{FILENAME}.{extension}"')
+    return response
+
+
+def pdf_response(ingredients):
+    """Render the cart page by page into a spooled file and stream it."""
+    if PDF_FONT not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT, settings.SHOPPING_CART_PDF_FONT))
+    file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    document = canvas.Canvas(file, pagesize=A4)
+    width, height = A4
+    top = height - PDF_MARGIN
+    y = top
+    for line in text_lines(ingredients):
+        if y < PDF_MARGIN:
+            document.showPage()
+            y = top
+        document.setFont(PDF_FONT, PDF_FONT_SIZE)
+        document.drawString(PDF_MARGIN, y, line.rstrip('\n'))
+        y -= PDF_LINE_HEIGHT
+    document.save()
+    file.seek(0)
+    return FileResponse(file, as_attachment=True,
+                        filename=f'{FILENAME}.pdf',
+                        content_type='application/pdf')
+
+
+def shopping_cart_response(ingredients, export_format):
+    """Return the export of the aggregated ingredients in the format."""
+    if export_format == 'csv':
+        return streaming_response(csv_lines(ingredients), 'text/csv', 'csv')
+    if export_format == 'pdf':
+        return pdf_response(ingredients)
+    return streaming_response(text_lines(ingredients), 'text/plain', 'txt')
@@ -0,0 +1,150 @@
+"""Custom serializer fields for the recipes API."""
+import binascii
+import re
+import tempfile
+import uuid
+
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+from rest_framework import serializers
+
+from constants import MAX_IMAGE_DIMENSION, MAX_IMAGE_SIZE
+from recipes import tag_registry
+
+BASE64_CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 1024 * 1024
+IMAGE_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+WHITESPACE = re.compile(r'\s')
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field resolved from objects fetched in one query.
+
+    The list serializer holding the field calls prefetch() with every pk of
+    the payload, then each item is looked up in memory.
+    """
+
+    def prefetch(self, pks):
+        """Fetch the objects of all valid pks with a single IN query."""
+        valid = set()
+        for pk in pks:
+            if isinstance(pk, bool):
+                continue
+            try:
+                valid.add(int(pk))
+            except (TypeError, ValueError):
+                continue
+        self.prefetched = self.get_queryset().in_bulk(valid)
+
+    def to_internal_value(self, data):
+        prefetched = getattr(self, 'prefetched', None)
+        if prefetched is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            instance = prefetched.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
+
+class PrefetchingListSerializer(serializers.ListSerializer):
+    """List serializer prefetching the related pks of all its items."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            for name, field in self.child.fields.items():
+                if isinstance(field, PrefetchedPrimaryKeyRelatedField):
+                    field.prefetch(item.get(name) for item in data
+                                   if isinstance(item, dict))
+        return super().to_internal_value(data)
+
+
+class TagPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Tag primary key field resolved from the in-process tag registry."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        tag = tag_registry.get_tag(data)
+        if tag is None:
+            self.fail('does_not_exist', pk_value=data)
+        return tag
+
+
+class StreamingImageField(serializers.ImageField):
+    """Image field accepting base64 strings as well as multipart uploads.
+
+    A base64 payload is rejected by its length before decoding, then decoded
+    chunk by chunk into a spooled temporary file. Pillow only reads the
+    header to check the format and dimensions before the image is verified.
+    """
+
+    default_error_messages = {
+        'invalid_image': 'Please upload a valid image.',
+        'invalid_type': "The type of the image couldn't be determined.",
+        'too_large': 'The image should not exceed {max_size} bytes.',
+        'too_big': ('The image should not exceed {max_dimension} pixels '
+                    'on a side.'),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            self.check_size(data.size)
+            self.check_image(data)
+            data.seek(0)
+            return data
+        if not isinstance(data, str):
+            self.fail('invalid_image')
+        file = self.decode(data)
+        size = file.tell()
+        extension = self.check_image(file)
+        file.seek(0)
+        return UploadedFile(file, name=f'{uuid.uuid4()}.{extension}',
+                            size=size)
+
+    def check_size(self, size):
+        if size > MAX_IMAGE_SIZE:
+            self.fail('too_large', max_size=MAX_IMAGE_SIZE)
+
+    def decode(self, data):
+        """Decode a base64 payload into a spooled temporary file."""
+        offset = data.find(';base64,', 0, BASE64_CHUNK_SIZE)
+        offset = 0 if offset == -1 else offset + len(';base64,')
+        if WHITESPACE.search(data, offset):
+            data, offset = WHITESPACE.sub('', data[offset:]), 0
+        self.check_size(
+            (len(data) - offset) * 3 // 4 - data[-2:].count('='))
+        file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            for start in range(offset, len(data), BASE64_CHUNK_SIZE):
+                file.write(binascii.a2b_base64(
+                    data[start:start + BASE64_CHUNK_SIZE]))
+        except (binascii.Error, ValueError):
+            file.close()
+            self.fail('invalid_image')
+        return file
+
+    def check_image(self, file):
+        """Check the format and dimensions, return the file extension."""
+        file.seek(0)
+        try:
+            with Image.open(file) as image:
+                if max(image.size) > MAX_IMAGE_DIMENSION:
+                    self.fail('too_big', max_dimension=MAX_IMAGE_DIMENSION)
+                extension = IMAGE_EXTENSIONS.get(image.format)
+                image.verify()
+        except serializers.ValidationError:
+            raise
+        except Exception:
+            self.fail('invalid_image')
+        if extension is None:
+            self.fail('invalid_type')
+        return extension
@@ -1,36 +1,50 @@
 from django_filters import rest_framework
 from django_filters.rest_framework import FilterSet, filters
 
-from recipes.models import Ingredient, Recipe, Tag
+from recipes import search, tag_registry
+from recipes.models import Ingredient, Recipe
 
 
 class RecipeFilter(FilterSet):
     """Filter class for recipes."""
 
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug'
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_registry.slug_choices,
+        method='tags_filter',
     )
     is_favorited = filters.BooleanFilter(method='favorited_filter')
     is_in_shopping_cart = filters.BooleanFilter(
         method='shopping_cart_filter'
     )
+    search = filters.CharFilter(method='search_filter')
 
     class Meta:
         model = Recipe
         fields = ('author', 'tags')
 
+    def tags_filter(self, queryset, name, value):
+        """Filter for recipes having any of the given tag slugs."""
+        if not value:
+            return queryset
+        return queryset.filter(
+            tags__id__in=tag_registry.ids_by_slugs(value)).distinct()
+
+    def search_filter(self, queryset, name, value):
+        """Full-text search over the name and text of recipes."""
+        if not value.strip():
+            return queryset
+        return search.search(queryset, value)
+
     def shopping_cart_filter(self, queryset, name, value):
         """Filter for recipes in the shopping cart."""
         if value and self.request.user.is_authenticated:
-            return queryset.filter(shoppingcart__user=self.request.user)
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
 
     def favorited_filter(self, queryset, name, value):
         """Filter for favorited recipes."""
         if value and self.request.user.is_authenticated:
-            return queryset.filter(favorite__user=self.request.user)
+            return queryset.filter(is_favorited=True)
         return queryset
 
 
@@ -0,0 +1,81 @@
+import hashlib
+from datetime import datetime, timezone
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from recipes import cache
+
+
+def last_changed(updated_at, *versions):
+    """Return the latest of updated_at and of versions in nanoseconds."""
+    changed = datetime.fromtimestamp(max(versions) / 1e9, timezone.utc)
+    return max(updated_at or changed, changed)
+
+
+class ConditionalGetMixin:
+    """Answer list and detail GETs with 304 when nothing has changed.
+
+    The validators are computed from updated_at of the recipes, so no
+    serialization happens for a request whose ETag still matches. Lists
+    also depend on the version of the recipe collection, which moves when
+    recipes are deleted or may leave a filtered list. Counters do not move
+    updated_at: details depend on their values and lists on their version.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        state = queryset.aggregate(last=Max('updated_at'), count=Count('id'))
+        versions = cache.get_versions((cache.RECIPES_VERSION_KEY,
+                                       cache.RECIPE_COUNTERS_VERSION_KEY))
+        params = sorted(request.query_params.lists())
+        return self.conditional_response(
+            request, last_changed(state['last'], *versions.values()),
+            (state['last'], state['count'], sorted(versions.items()), params),
+            super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            state = self.get_queryset().filter(
+                pk=kwargs[self.lookup_url_kwarg or self.lookup_field]
+            ).values_list('updated_at', 'favorites_count',
+                          'in_carts_count').first()
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        if state is None:
+            return super().retrieve(request, *args, **kwargs)
+        # The counters version is shared by all the recipes, so it only
+        # moves Last-Modified while the ETag depends on the counts.
+        version = cache.get_recipe_counters_version()
+        return self.conditional_response(
+            request, last_changed(state[0], version), state,
+            super().retrieve, *args, **kwargs)
+
+    def conditional_response(self, request, last_modified, validators,
+                             view, *args, **kwargs):
+        user_state = None
+        if request.user.is_authenticated:
+            user_state = (request.user.id,
+                          cache.get_user_state(request.user.id))
+        etag = quote_etag(hashlib.md5(
+            repr((validators, user_state)).encode()).hexdigest())
+        # The favorite, cart and subscription flags of an authenticated user
+        # are not reflected in updated_at, so only the ETag is used for them.
+        timestamp = (None if user_state
+                     else int(last_modified.timestamp()))
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        # A 304 repeats the validators the 200 would have sent.
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ('Authorization',))
+        return response
@@ -0,0 +1,54 @@
+import json
+
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+
+
+class ShoppingCartRenderer(BaseRenderer):
+    """Selects the shopping cart export format.
+
+    The export itself is streamed by the view; the renderer only takes part
+    in content negotiation and renders error responses.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class ShoppingCartTextRenderer(ShoppingCartRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class ShoppingCartCSVRenderer(ShoppingCartRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class ShoppingCartPDFRenderer(ShoppingCartRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+class ShoppingCartNegotiation(DefaultContentNegotiation):
+    """Serve the first export format when Accept matches none of them.
+
+    API clients usually send Accept: application/json, which used to get
+    the text export. An explicit ?format= still selects the format and has
+    to name one of them.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        try:
+            return super().select_renderer(request, renderers, format_suffix)
+        except NotAcceptable:
+            export_format = format_suffix or request.query_params.get(
+                self.settings.URL_FORMAT_OVERRIDE)
+            if export_format:
+                renderers = self.filter_renderers(renderers, export_format)
+            return renderers[0], renderers[0].media_type
@@ -1,13 +1,22 @@
-from drf_extra_fields.fields import Base64ImageField
+import json
+
+from django.db import IntegrityError, models, transaction
+from django.http import QueryDict
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import IntegerField, SerializerMethodField
 
-from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from recipes import cache, images
+from recipes.api.fields import (PrefetchedPrimaryKeyRelatedField,
+                                PrefetchingListSerializer,
+                                StreamingImageField,
+                                TagPrimaryKeyRelatedField)
+from recipes.models import (Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingListItem, Tag)
 from users.api.serializers import UserSerializer
 from recipes.models import Favorite, ShoppingCart
 from gen_ser.api.serializers import GenericRecipeSerializer
-from constants import MAX_AMOUNT, MIN_AMOUNT
+from constants import MAX_AMOUNT, MAX_BATCH_SIZE, MIN_AMOUNT
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -30,20 +39,13 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit')
 
 
-class IngredientInRecipeSerializer(serializers.ModelSerializer):
-    """Serializer for ingredients in a recipe."""
-
-    id = serializers.ReadOnlyField(source='ingredient.id')
-    name = serializers.ReadOnlyField(source='ingredient.name')
-    measurement_unit = serializers.ReadOnlyField(
-        source='ingredient.measurement_unit'
-    )
-
-    class Meta:
-        """Meta options for IngredientInRecipeSerializer."""
+class RecipeListSerializer(serializers.ListSerializer):
+    """Serialize recipes with one batch of cache lookups for all of them."""
 
-        model = IngredientInRecipe
-        fields = ('id', 'name', 'measurement_unit', 'amount')
+    def to_representation(self, data):
+        recipes = list(data.all() if isinstance(data, models.Manager)
+                       else data)
+        return self.child.represent_many(recipes)
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -51,17 +53,51 @@ class RecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(read_only=True, many=True)
     is_favorited = SerializerMethodField(read_only=True)
     is_in_shopping_cart = SerializerMethodField(read_only=True)
-    ingredients = IngredientInRecipeSerializer(read_only=True, many=True,
-                                               source='ingredients_in_recipe')
+    ingredients = serializers.ReadOnlyField(source='ingredients_snapshot')
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags',
                   'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time')
+                  'name', 'image', 'image_variants', 'text', 'cooking_time',
+                  'favorites_count', 'in_carts_count')
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        return self.represent_many([instance])[0]
+
+    def represent_many(self, recipes):
+        """Serve the cached recipe fragments with the per-user fields."""
+        keys = cache.fragment_keys(recipes)
+        fragments = cache.get_fragments(recipes, keys)
+        rendered = {}
+        for recipe in recipes:
+            if recipe.id not in fragments:
+                rendered[recipe.id] = super().to_representation(recipe)
+        cache.set_fragments(recipes, rendered, keys)
+        fragments.update(rendered)
+        return [self.add_user_fields(recipe, fragments[recipe.id])
+                for recipe in recipes]
+
+    def add_user_fields(self, instance, fragment):
+        """Overlay the per-user and frequently changing fields."""
+        data = fragment.copy()
+        data['author'] = fragment['author'].copy()
+        data['author']['is_subscribed'] = self.fields[
+            'author'].get_is_subscribed(instance.author)
+        data['image'] = self.fields['image'].to_representation(instance.image)
+        data['image_variants'] = images.variant_urls(
+            instance.image_variants, self.context.get('request'))
+        data['is_favorited'] = self.get_is_favorited(instance)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(instance)
+        data['favorites_count'] = instance.favorites_count
+        data['in_carts_count'] = instance.in_carts_count
+        return data
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return (
             request
@@ -70,6 +106,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         return (
             request
@@ -81,7 +119,7 @@ class RecipeSerializer(serializers.ModelSerializer):
 class IngredientInRecipePostSerializer(serializers.ModelSerializer):
     """Serializer for ingredients in a recipe for POST requests."""
 
-    id = serializers.PrimaryKeyRelatedField(
+    id = PrefetchedPrimaryKeyRelatedField(
         queryset=Ingredient.objects.all(), write_only=True
     )
     amount = IntegerField(
@@ -94,14 +132,15 @@ class IngredientInRecipePostSerializer(serializers.ModelSerializer):
 
         model = IngredientInRecipe
         fields = ('id', 'amount')
+        list_serializer_class = PrefetchingListSerializer
 
 
 class RecipePostSerializer(serializers.ModelSerializer):
     """Serializer for creating recipes via POST requests."""
 
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = TagPrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True)
-    image = Base64ImageField()
+    image = StreamingImageField()
     author = UserSerializer(read_only=True)
     ingredients = IngredientInRecipePostSerializer(many=True)
 
@@ -112,6 +151,27 @@ class RecipePostSerializer(serializers.ModelSerializer):
         fields = ('id', 'author', 'ingredients', 'tags', 'image',
                   'name', 'text', 'cooking_time')
 
+    def to_internal_value(self, data):
+        """Accept multipart forms with JSON-encoded ingredients and tags."""
+        if isinstance(data, QueryDict):
+            data = self.parse_form(data)
+        return super().to_internal_value(data)
+
+    @staticmethod
+    def parse_form(data):
+        """Turn a multipart form into the structure of a JSON body."""
+        parsed = data.dict()
+        for name in ('ingredients', 'tags'):
+            values = data.getlist(name)
+            if len(values) == 1 and values[0].lstrip().startswith('['):
+                try:
+                    values = json.loads(values[0])
+                except ValueError:
+                    raise ValidationError({name: 'Invalid JSON.'})
+            if values:
+                parsed[name] = values
+        return parsed
+
     def validate(self, attrs):
         """Validate creation and modification of recipes."""
         ingredients = attrs.get('ingredients')
@@ -157,6 +217,31 @@ class RecipePostSerializer(serializers.ModelSerializer):
             recipe_ingredients.append(recipe_ingredient)
         IngredientInRecipe.objects.bulk_create(recipe_ingredients)
 
+    @staticmethod
+    def update_ingredients_amounts(ingredients, recipe):
+        """Apply only the differences to the ingredients of a recipe."""
+        amounts = {item['id'].id: item['amount'] for item in ingredients}
+        current = {row.ingredient_id: row
+                   for row in recipe.ingredients_in_recipe.all()}
+        removed = current.keys() - amounts.keys()
+        if removed:
+            IngredientInRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed).delete()
+        changed = []
+        for ingredient_id, row in current.items():
+            amount = amounts.get(ingredient_id, row.amount)
+            if row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        IngredientInRecipe.objects.bulk_update(changed, ('amount',))
+        IngredientInRecipe.objects.bulk_create([
+            IngredientInRecipe(recipe=recipe, ingredient_id=ingredient_id,
+                               amount=amount)
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
+        ])
+
+    @transaction.atomic
     def create(self, validated_data):
         """Create a recipe."""
         ingredients = validated_data.pop('ingredients')
@@ -166,18 +251,20 @@ class RecipePostSerializer(serializers.ModelSerializer):
         )
         recipe.tags.set(tags)
         self.ingredients_amounts(ingredients, recipe)
+        recipe.refresh_ingredients_snapshot()
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Update a recipe."""
+        """Update a recipe, writing only the changed ingredients and tags."""
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        instance.ingredients.clear()
-        instance.tags.clear()
         instance.tags.set(tags)
-        self.ingredients_amounts(ingredients, instance)
-        return super().update(instance, validated_data)
+        self.update_ingredients_amounts(ingredients, instance)
+        instance = super().update(instance, validated_data)
+        instance.refresh_ingredients_snapshot()
+        return instance
 
     def to_representation(self, instance):
         """Return the created recipe to the user."""
@@ -188,16 +275,20 @@ class RecipePostSerializer(serializers.ModelSerializer):
 class FavoriteSerializer(serializers.ModelSerializer):
     """Serializer for favorite recipes."""
 
+    user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+
     class Meta:
         model = Favorite
         fields = ('user', 'recipe',)
 
-    def validate(self, data):
-        if self.Meta.model.objects.filter(user=data['user'],
-                                          recipe=data['recipe']).exists():
+    def create(self, validated_data):
+        """Insert the row, relying on the unique constraint."""
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
             raise serializers.ValidationError(
                 'You cannot add the recipe again.')
-        return data
 
     def to_representation(self, instance):
         return GenericRecipeSerializer(
@@ -211,3 +302,27 @@ class ShoppingCartSerializer(FavoriteSerializer):
     class Meta:
         model = ShoppingCart
         fields = ('user', 'recipe',)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Serializer for a batch of recipe ids."""
+
+    recipes = serializers.ListField(
+        child=IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BATCH_SIZE,
+    )
+
+
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    """Serializer for the aggregated shopping list."""
+
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = ShoppingListItem
+        fields = ('id', 'name', 'measurement_unit', 'amount')
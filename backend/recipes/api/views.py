@@ -1,5 +1,5 @@
-from django.db.models import Sum
-from django.http import FileResponse
+from django.db.models import Exists, OuterRef, Value
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
@@ -9,17 +9,29 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 
+from recipes import ingredient_search, tag_registry
+from recipes.api.exports import shopping_cart_response
 from recipes.api.filters import IngredientFilter, RecipeFilter
+from recipes.api.mixins import ConditionalGetMixin
+from recipes.api.renderers import (ShoppingCartCSVRenderer,
+                                   ShoppingCartNegotiation,
+                                   ShoppingCartPDFRenderer,
+                                   ShoppingCartTextRenderer)
 from recipes.api.serializers import (IngredientSerializer,
                                      RecipePostSerializer, RecipeSerializer,
                                      TagSerializer,
                                      FavoriteSerializer,
-                                     ShoppingCartSerializer)
-from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                            ShoppingCart, Tag)
-from users.api.pagination import UserPagination
+                                     RecipeIdsSerializer,
+                                     ShoppingCartSerializer,
+                                     ShoppingListItemSerializer)
+from recipes.models import (Favorite, FeedEntry, Ingredient, Recipe,
+                            ShoppingCart, ShoppingListItem, Tag)
+from users.api.filters import StableOrderingFilter
+from users.api.pagination import FeedPagination
 from users.api.permissions import AuthorOrReadOnly
 
+EXPORT_CHUNK_SIZE = 500
+
 
 class TagsViewSet(viewsets.ReadOnlyModelViewSet):
     """View for tags."""
@@ -29,16 +41,45 @@ class TagsViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (AllowAny,)
     paginator = None
 
+    def list(self, request, *args, **kwargs):
+        """Return the tags from the in-process registry."""
+        serializer = self.get_serializer(tag_registry.all_tags(), many=True)
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return a tag from the in-process registry."""
+        tag = tag_registry.get_tag(kwargs[self.lookup_field])
+        if tag is None:
+            raise Http404
+        return Response(self.get_serializer(tag).data)
+
 
-class RecipesViewSet(ModelViewSet):
+class RecipesViewSet(ConditionalGetMixin, ModelViewSet):
     """View for recipes."""
 
     queryset = Recipe.objects.all().select_related('author').prefetch_related(
-        'tags', 'ingredients_in_recipe')
+        'tags')
     permission_classes = (AuthorOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, StableOrderingFilter)
     filterset_class = RecipeFilter
-    pagination_class = UserPagination
+    ordering_fields = ('date', 'favorites_count', 'in_carts_count')
+    pagination_class = FeedPagination
+    cursor_ordering = ('-date', '-id')
+
+    def get_queryset(self):
+        """Annotate recipes with the per-user favorite and cart flags."""
+        user = self.request.user
+        if not user.is_authenticated:
+            return super().get_queryset().annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
+        return super().get_queryset().annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+        )
 
     def get_serializer_class(self):
         """Select a serializer."""
@@ -50,12 +91,44 @@ class RecipesViewSet(ModelViewSet):
     def shopping_cart_and_favorite_serialization(serializer, request, pk):
         """Add or remove a recipe from the shopping cart or favorites."""
         context = {'request': request}
-        data = {'user': request.user.id, 'recipe': pk}
+        data = {'recipe': pk}
         serializer = serializer(data=data, context=context)
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @staticmethod
+    def get_batch_ids(request):
+        """Return the unique recipe ids of a batch request in order."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return list(dict.fromkeys(serializer.validated_data['recipes']))
+
+    def batch_add(self, model, request):
+        """Add many recipes to the shopping cart or favorites."""
+        ids = self.get_batch_ids(request)
+        existing, added = model.objects.add_many(request.user, ids)
+        results = []
+        for pk in ids:
+            if pk in added:
+                result = 'added'
+            elif pk in existing:
+                result = 'exists'
+            else:
+                result = 'not_found'
+            results.append({'id': pk, 'status': result})
+        return Response({'results': results})
+
+    def batch_remove(self, model, request, ids=None):
+        """Remove many recipes from the shopping cart or favorites."""
+        removed = model.objects.remove_many(request.user, ids)
+        if ids is None:
+            ids = sorted(removed)
+        return Response({'results': [
+            {'id': pk, 'status': 'removed' if pk in removed else 'absent'}
+            for pk in ids
+        ]})
+
     @action(methods=['post'],
             permission_classes=[IsAuthenticated],
             detail=True,
@@ -68,14 +141,35 @@ class RecipesViewSet(ModelViewSet):
     @shopping_cart.mapping.delete
     def shopping_cart_delete(self, request, pk):
         """Delete a recipe from the shopping cart."""
-        data = ShoppingCart.objects.filter(
+        deleted, _ = ShoppingCart.objects.filter(
             user_id=request.user.id, recipe_id=pk
-        )
-        if data.exists():
-            data.delete()
+        ).delete()
+        if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=['post'],
+            permission_classes=[IsAuthenticated],
+            detail=False,
+            url_path='shopping_cart/batch')
+    def shopping_cart_batch(self, request):
+        """Add many recipes to the shopping cart."""
+        return self.batch_add(ShoppingCart, request)
+
+    @shopping_cart_batch.mapping.delete
+    def shopping_cart_batch_delete(self, request):
+        """Delete many recipes from the shopping cart."""
+        return self.batch_remove(ShoppingCart, request,
+                                 self.get_batch_ids(request))
+
+    @action(methods=['delete'],
+            permission_classes=[IsAuthenticated],
+            detail=False,
+            url_path='shopping_cart/clear')
+    def shopping_cart_clear(self, request):
+        """Empty the shopping cart."""
+        return self.batch_remove(ShoppingCart, request)
+
     @action(methods=['post'],
             permission_classes=[IsAuthenticated],
             detail=True)
@@ -87,53 +181,76 @@ class RecipesViewSet(ModelViewSet):
     @favorite.mapping.delete
     def favorite_delete(self, request, pk):
         """Delete a recipe from the favorites."""
-        data = Favorite.objects.filter(
+        deleted, _ = Favorite.objects.filter(
             user_id=request.user.id, recipe__id=pk
-        )
-        if data.exists():
-            data.delete()
+        ).delete()
+        if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
         get_object_or_404(Recipe, id=pk)
         return Response({'Error': 'No such recipe'},
                         status=status.HTTP_400_BAD_REQUEST)
 
-    @staticmethod
-    def get_shopping_cart_txt_response(ingredients):
-        shopping_cart = 'Shopping Cart.\n'
-        list_order = 0
-        for ingredient in ingredients:
-            list_order += 1
-            shopping_cart += (
-                f'{list_order}) '
-                f'{ingredient["ingredient__name"][0].upper()}'
-                f'{ingredient["ingredient__name"][1:]} - '
-                f'{ingredient["ingredient__measurement_unit"]} '
-                f'({ingredient["amount"]})\n'
-            )
-        filename = 'ShoppingCart.txt'
-        return FileResponse(
-            shopping_cart,
-            as_attachment=True,
-            filename=filename,
-            content_type='text/plain'
-        )
+    @action(methods=['post'],
+            permission_classes=[IsAuthenticated],
+            detail=False,
+            url_path='favorite/batch')
+    def favorite_batch(self, request):
+        """Add many recipes to the favorites."""
+        return self.batch_add(Favorite, request)
+
+    @favorite_batch.mapping.delete
+    def favorite_batch_delete(self, request):
+        """Delete many recipes from the favorites."""
+        return self.batch_remove(Favorite, request,
+                                 self.get_batch_ids(request))
 
     @action(methods=['get'],
             permission_classes=[IsAuthenticated],
-            detail=False)
+            detail=False,
+            renderer_classes=(ShoppingCartTextRenderer,
+                              ShoppingCartCSVRenderer,
+                              ShoppingCartPDFRenderer),
+            content_negotiation_class=ShoppingCartNegotiation)
     def download_shopping_cart(self, request):
-        """Download the shopping cart."""
-        if request.user.shoppingcart_set.exists():
-            ingredients = IngredientInRecipe.objects.filter(
-                recipe__shoppingcart__user=request.user
-            ).values(
-                'ingredient__name',
-                'ingredient__measurement_unit'
-            ).annotate(amount=Sum('amount'))
-            return self.get_shopping_cart_txt_response(ingredients)
+        """Download the shopping cart as txt, csv or pdf."""
+        ingredients = request.user.shopping_list.values(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'amount',
+        ).order_by('ingredient__name')
+        if ingredients.exists():
+            return shopping_cart_response(
+                ingredients.iterator(chunk_size=EXPORT_CHUNK_SIZE),
+                request.accepted_renderer.format)
 
         return Response(status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=['get'],
+            permission_classes=[IsAuthenticated],
+            detail=False)
+    def feed(self, request):
+        """Recipes of the followed authors, newest first."""
+        entries = self.paginate_queryset(FeedEntry.objects.filter(
+            subscriber=request.user).only('id', 'date', 'recipe_id').order_by(
+            '-date', '-id'))
+        recipes = self.get_queryset().in_bulk(
+            [entry.recipe_id for entry in entries])
+        serializer = RecipeSerializer(
+            [recipes[entry.recipe_id] for entry in entries
+             if entry.recipe_id in recipes],
+            many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    @action(methods=['get'],
+            permission_classes=[IsAuthenticated],
+            detail=False)
+    def shopping_list(self, request):
+        """Preview the aggregated shopping list."""
+        items = ShoppingListItem.objects.filter(
+            user=request.user).select_related('ingredient').order_by(
+            'ingredient__name')
+        return Response(ShoppingListItemSerializer(items, many=True).data)
+
 
 class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
     """View for ingredients."""
@@ -144,3 +261,12 @@ class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend, SearchFilter)
     search_fields = ('^name',)
     filterset_class = IngredientFilter
+
+    def list(self, request, *args, **kwargs):
+        """Answer name autocomplete from the ingredient indexes."""
+        if SearchFilter.search_param in request.query_params:
+            return super().list(request, *args, **kwargs)
+        return Response(ingredient_search.search(
+            request.query_params.get('name', ''),
+            fuzzy=request.query_params.get('fuzzy') in ('1', 'true'),
+        ))
@@ -7,3 +7,7 @@ class RecipesConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        """Connect the signal handlers of the app."""
+        import recipes.signals  # noqa: F401
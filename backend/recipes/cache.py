@@ -0,0 +1,159 @@
+"""Versioned cache of the user-independent part of serialized recipes.
+
+A fragment is stored under a key made of the recipe id and the current
+versions of the recipe, of its author and of the tag catalog. Bumping one of
+these versions makes every fragment depending on it unreachable, so there
+is no need to find and delete stale entries.
+
+Versions are rows of the database, shared by every process and never
+evicted, while fragments may live in a per-process or a shared cache.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from recipes.models import CacheVersion
+
+FRAGMENT_TIMEOUT = 60 * 60 * 24
+RECIPE_VERSION_KEY = 'recipe:{}:version'
+USER_VERSION_KEY = 'user:{}:version'
+TAGS_VERSION_KEY = 'tags:version'
+RECIPES_VERSION_KEY = 'recipes:version'
+RECIPE_COUNTERS_VERSION_KEY = 'recipes:counters:version'
+USER_STATE_KEY = 'user:{}:state'
+FRAGMENT_KEY = 'recipe:{}:fragment:{}:{}:{}'
+
+
+def _new_version():
+    # Versions are never reused, even when a version key has been evicted,
+    # so a fragment built for an old version can never be read again.
+    return time.time_ns()
+
+
+def get_versions(keys):
+    """Return the current versions of the keys, creating missing ones."""
+    keys = list(keys)
+    versions = dict(CacheVersion.objects.filter(key__in=keys).values_list(
+        'key', 'version'))
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        CacheVersion.objects.bulk_create(
+            [CacheVersion(key=key, version=_new_version()) for key in missing],
+            ignore_conflicts=True)
+        versions.update(CacheVersion.objects.filter(
+            key__in=missing).values_list('key', 'version'))
+    return versions
+
+
+def _store_versions(keys):
+    version = _new_version()
+    CacheVersion.objects.bulk_create(
+        [CacheVersion(key=key, version=version) for key in keys],
+        ignore_conflicts=True)
+    CacheVersion.objects.filter(key__in=keys).update(version=version)
+
+
+def bump_versions(keys):
+    """Invalidate the fragments depending on the keys once committed."""
+    keys = list(keys)
+    if keys:
+        transaction.on_commit(lambda: _store_versions(keys))
+
+
+def bump_recipes(recipe_ids):
+    bump_versions(RECIPE_VERSION_KEY.format(pk) for pk in recipe_ids)
+
+
+def bump_user(user_id):
+    bump_versions((USER_VERSION_KEY.format(user_id),))
+
+
+def bump_tags():
+    bump_versions((TAGS_VERSION_KEY,))
+
+
+def bump_recipes_collection():
+    """Mark a change that may remove recipes from lists.
+
+    Deleted recipes, or recipes leaving a filtered list, do not move the
+    latest updated_at of the list, so lists also depend on this version.
+    """
+    bump_versions((RECIPES_VERSION_KEY,))
+
+
+def bump_recipe_counters():
+    """Mark a change of the favorites or cart counters of recipes.
+
+    Counters are left out of updated_at and of the fragments, so lists also
+    depend on this version.
+    """
+    bump_versions((RECIPE_COUNTERS_VERSION_KEY,))
+
+
+def get_recipe_counters_version():
+    """Return the version of the recipe counters."""
+    return get_versions(
+        (RECIPE_COUNTERS_VERSION_KEY,))[RECIPE_COUNTERS_VERSION_KEY]
+
+
+def bump_user_state(user_id):
+    """Mark a change of the favorites, cart or subscriptions of a user."""
+    bump_versions((USER_STATE_KEY.format(user_id),))
+
+
+def get_user_state(user_id):
+    """Return the version of the favorites, cart and subscriptions."""
+    key = USER_STATE_KEY.format(user_id)
+    return get_versions((key,))[key]
+
+
+def fragment_keys(recipes):
+    """Return the cache keys of the current fragments of the recipes.
+
+    The versions of all the recipes and authors are read in one batch.
+    """
+    keys = {TAGS_VERSION_KEY}
+    for recipe in recipes:
+        keys.add(RECIPE_VERSION_KEY.format(recipe.id))
+        keys.add(USER_VERSION_KEY.format(recipe.author_id))
+    versions = get_versions(keys)
+    return {
+        recipe.id: FRAGMENT_KEY.format(
+            recipe.id,
+            versions[RECIPE_VERSION_KEY.format(recipe.id)],
+            versions[USER_VERSION_KEY.format(recipe.author_id)],
+            versions[TAGS_VERSION_KEY])
+        for recipe in recipes
+    }
+
+
+def _stamp(recipe):
+    return recipe.updated_at.isoformat()
+
+
+def get_fragments(recipes, keys):
+    """Return the cached fragments of the recipes by recipe id.
+
+    A fragment keeps updated_at of the instance it was rendered from, and
+    is ignored when it differs from the one of the recipe. A fragment
+    rendered from an instance loaded before a change and stored once the
+    versions were bumped is therefore never served.
+    """
+    entries = cache.get_many(list(keys.values()))
+    fragments = {}
+    for recipe in recipes:
+        entry = entries.get(keys[recipe.id])
+        if entry is not None and entry['stamp'] == _stamp(recipe):
+            fragments[recipe.id] = entry['fragment']
+    return fragments
+
+
+def set_fragments(recipes, fragments, keys):
+    """Store the fragments of the recipes rendered by the caller."""
+    if fragments:
+        cache.set_many({
+            keys[recipe.id]: {'stamp': _stamp(recipe),
+                              'fragment': fragments[recipe.id]}
+            for recipe in recipes if recipe.id in fragments
+        }, FRAGMENT_TIMEOUT)
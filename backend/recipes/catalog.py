@@ -0,0 +1,134 @@
+"""Streaming loader of the ingredient catalog.
+
+Rows are read lazily from CSV or JSON files and inserted in batches,
+skipping the (name, measurement_unit) pairs that already exist, so
+reloading the catalog never deletes ingredients used by recipes.
+"""
+import csv
+import io
+import json
+import os
+
+from django.db import connection, transaction
+
+from constants import MAX_TAG_NAME
+from recipes import ingredient_index
+from recipes.models import Ingredient
+
+BATCH_SIZE = 5000
+READ_SIZE = 64 * 1024
+
+
+def read_csv(path):
+    """Yield (name, measurement_unit) pairs of a headerless CSV file."""
+    with open(path, encoding='utf8', newline='') as file:
+        for row in csv.reader(file):
+            if len(row) >= 2:
+                yield row[0], row[1]
+
+
+def read_json(path):
+    """Yield (name, measurement_unit) pairs of a JSON array of objects.
+
+    The array is decoded one object at a time, so the whole file is never
+    held in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf8') as file:
+        buffer = file.read(READ_SIZE).lstrip()
+        if not buffer.startswith('['):
+            raise ValueError(f'{path} does not hold a JSON array.')
+        buffer = buffer[1:]
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError:
+                chunk = file.read(READ_SIZE)
+                if not chunk:
+                    raise
+                buffer += chunk
+                continue
+            yield item['name'], item['measurement_unit']
+            buffer = buffer[end:]
+
+
+def read_rows(path):
+    """Yield the catalog rows of a CSV or JSON file."""
+    if os.path.splitext(path)[1].lower() == '.json':
+        return read_json(path)
+    return read_csv(path)
+
+
+def clean(rows):
+    """Yield stripped rows that fit the model, skipping the others."""
+    for name, measurement_unit in rows:
+        name, measurement_unit = name.strip(), measurement_unit.strip()
+        if (name and measurement_unit and len(name) <= MAX_TAG_NAME
+                and len(measurement_unit) <= MAX_TAG_NAME):
+            yield name, measurement_unit
+
+
+def batches(rows, size=BATCH_SIZE):
+    """Split the rows into lists of at most size items."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _load_copy(rows, batch_size):
+    table = Ingredient._meta.db_table
+    read = 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMP TABLE ingredient_load '
+            '(name varchar(%s), measurement_unit varchar(%s)) '
+            'ON COMMIT DROP', (MAX_TAG_NAME, MAX_TAG_NAME))
+        for batch in batches(rows, batch_size):
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(batch)
+            buffer.seek(0)
+            cursor.copy_expert(
+                'COPY ingredient_load (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)', buffer)
+            read += len(batch)
+        cursor.execute(
+            f'INSERT INTO {table} (name, measurement_unit) '
+            'SELECT DISTINCT name, measurement_unit FROM ingredient_load '
+            'ON CONFLICT (name, measurement_unit) DO NOTHING')
+        return read, cursor.rowcount
+
+
+def _load_bulk(rows, batch_size):
+    read = 0
+    before = Ingredient.objects.count()
+    for batch in batches(rows, batch_size):
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name, measurement_unit=measurement_unit)
+             for name, measurement_unit in batch],
+            ignore_conflicts=True,
+        )
+        read += len(batch)
+    return read, Ingredient.objects.count() - before
+
+
+def load(rows, batch_size=BATCH_SIZE):
+    """Insert the missing catalog rows, return (rows read, rows inserted).
+
+    PostgreSQL receives the rows through COPY into a temporary table and a
+    single INSERT ... ON CONFLICT DO NOTHING; other databases use batched
+    bulk_create with ignore_conflicts. The caller builds the ingredient
+    index once the load is done.
+    """
+    rows = clean(rows)
+    with ingredient_index.deferred_builds(), transaction.atomic():
+        if connection.vendor == 'postgresql':
+            return _load_copy(rows, batch_size)
+        return _load_bulk(rows, batch_size)
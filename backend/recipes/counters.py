@@ -0,0 +1,59 @@
+"""Denormalized counters of favorites, carts, recipes and followers.
+
+Counter updates leave Recipe.updated_at alone: counters are not part of the
+cached recipe fragments. Changes of the recipe counters bump their own cache
+version instead, which is part of the validators of the recipe lists.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from recipes import cache
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+BATCH_SIZE = 500
+
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+# (counter owner, counter field, counted model, foreign key to the owner)
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+)
+
+
+def change(queryset, field, delta):
+    """Add delta to a counter of the rows, never going below zero."""
+    if queryset.model is Recipe:
+        cache.bump_recipe_counters()
+    return queryset.update(**{field: Greatest(F(field) + delta, 0)})
+
+
+def count_of(model, field):
+    """Return a subquery counting the rows of model pointing to OuterRef."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('*')).values('total')), 0)
+
+
+def reconcile(check=False):
+    """Recount the drifted counters, return the number of fixed rows."""
+    drifted = {}
+    for owner, field, model, foreign_key in COUNTERS:
+        ids = list(owner.objects.annotate(
+            actual=count_of(model, foreign_key)).exclude(
+            **{field: F('actual')}).values_list('pk', flat=True))
+        if not check:
+            values = {field: count_of(model, foreign_key)}
+            for start in range(0, len(ids), BATCH_SIZE):
+                owner.objects.filter(
+                    pk__in=ids[start:start + BATCH_SIZE]).update(**values)
+        if ids and not check and owner is Recipe:
+            cache.bump_recipe_counters()
+        drifted[f'{owner._meta.model_name}.{field}'] = len(ids)
+    return drifted
@@ -0,0 +1,328 @@
+"""Deterministic generator of large synthetic datasets.
+
+Rows are generated in chunks of CHUNK_SIZE, each from its own random
+generator seeded by the dataset seed, the row kind and the chunk number,
+so the same options always produce the same data, whatever the number of
+worker processes or the rows already in the database. Dates are spread
+over the days before a fixed epoch, and rows created by other workers are
+referenced through their natural keys: the usernames of the generated
+users, and the dates of the recipes of these users.
+
+Authors, recipes and followed authors are drawn from a Zipf distribution:
+a few of them get most of the recipes, favorites and subscribers.
+"""
+import io
+import random
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import accumulate, chain
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from faker import Faker
+from PIL import Image
+
+from constants import MAX_TAG_NAME
+from recipes import images
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe,
+                            Recipe, ShoppingCart, Tag)
+from users.models import Subscription, User
+
+CHUNK_SIZE = 1000
+FAKER_LOCALE = 'ru_RU'
+MAX_GENERATED_AMOUNT = 500
+MAX_GENERATED_COOKING_TIME = 180
+MAX_TAGS_PER_RECIPE = 3
+SAMPLING_ROUNDS = 10
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+USERNAME_PREFIX = 'fake{}_'
+
+_plan = None
+
+
+def _rng(kind, chunk):
+    return random.Random(f'{_plan["seed"]}:{kind}:{chunk}')
+
+
+@lru_cache(maxsize=None)
+def _faker():
+    return Faker(FAKER_LOCALE)
+
+
+@lru_cache(maxsize=None)
+def _popularity(kind, count):
+    """Return the ids ordered by rank and the cumulative Zipf weights."""
+    order = array('q', range(count))
+    random.Random(f'{_plan["seed"]}:{kind}:order').shuffle(order)
+    exponent = _plan['skew']
+    weights = array('d', accumulate(
+        1 / (rank + 1) ** exponent for rank in range(count)))
+    return order, weights
+
+
+def _draw(rng, kind, ids, k, exclude=None):
+    """Draw up to k distinct popularity-weighted ids of a generated kind."""
+    order, weights = _popularity(kind, len(ids))
+    picked = set()
+    for _ in range(SAMPLING_ROUNDS):
+        missing = k - len(picked)
+        if missing <= 0:
+            break
+        picked.update(ids[index] for index in rng.choices(
+            order, cum_weights=weights, k=missing))
+        picked.discard(exclude)
+    return sorted(picked)[:k]
+
+
+def _username_prefix():
+    return USERNAME_PREFIX.format(_plan['seed'])
+
+
+@lru_cache(maxsize=None)
+def _user_ids():
+    """Return the ids of the generated users by generation index."""
+    prefix = _username_prefix()
+    ids = array('q', bytes(8 * _plan['users']))
+    for username, pk in User.objects.filter(
+            username__startswith=prefix).values_list(
+            'username', 'id').iterator():
+        ids[int(username[len(prefix):].split('_', 1)[0])] = pk
+    return ids
+
+
+def _generated_recipes():
+    """Return the recipes of the generated users in generation order.
+
+    The dates of the generated recipes grow with their index.
+    """
+    return Recipe.objects.filter(
+        author__username__startswith=_username_prefix()).order_by(
+        'date', 'id')
+
+
+@lru_cache(maxsize=None)
+def _recipe_ids():
+    """Return the ids of the generated recipes by generation index."""
+    return array('q', _generated_recipes().values_list(
+        'id', flat=True).iterator())
+
+
+def _share(total, parts, index):
+    """Return the part of total given to the index-th of parts."""
+    return total * (index + 1) // parts - total * index // parts
+
+
+def _date(rng, index, count):
+    """Spread the rows over the days before EPOCH, oldest first.
+
+    Each row gets a random moment of its own slot of the period, so the
+    dates grow with the index.
+    """
+    span = timedelta(days=_plan['days'])
+    return EPOCH - span + span * (index + rng.random()) / count
+
+
+@contextmanager
+def _explicit_dates():
+    # bulk_create fills auto_now fields with the current time; the generated
+    # rows are spread over the period instead.
+    fields = (Recipe._meta.get_field('date'),
+              Recipe._meta.get_field('updated_at'))
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def placeholder_image(seed):
+    """Store a gradient photo shared by the generated recipes.
+
+    Return its storage name and the names of its variants.
+    """
+    rng = random.Random(f'{seed}:image')
+    start = [rng.randrange(256) for _ in range(3)]
+    end = [rng.randrange(256) for _ in range(3)]
+    gradient = Image.linear_gradient('L').resize((960, 640))
+    image = Image.merge('RGB', [
+        gradient.point(lambda value, a=a, b=b: a + (b - a) * value // 255)
+        for a, b in zip(start, end)
+    ])
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=85)
+    name = default_storage.save('recipes/generated.jpg',
+                                ContentFile(buffer.getvalue()))
+    return name, images.make_variants(name)
+
+
+def make_plan(users, recipes, favorites, carts, subscriptions,
+              min_ingredients, max_ingredients, skew, days, seed,
+              password):
+    """Collect everything the workers need to generate the rows."""
+    # Ingredients and tags are ordered by their natural keys, so their
+    # sampling does not depend on the primary keys of the database.
+    catalog = list(Ingredient.objects.order_by(
+        'name', 'measurement_unit').values_list(
+        'id', 'name', 'measurement_unit'))
+    image, variants = placeholder_image(seed)
+    return {
+        'users': users,
+        'recipes': recipes,
+        'favorites': min(favorites, users * recipes),
+        'carts': min(carts, users * recipes),
+        'subscriptions': min(subscriptions, users * (users - 1)),
+        'min_ingredients': min(min_ingredients, len(catalog)),
+        'max_ingredients': min(max_ingredients, len(catalog)),
+        'skew': skew,
+        'days': days,
+        'seed': seed,
+        'password': make_password(password),
+        'catalog': catalog,
+        'tag_ids': list(Tag.objects.order_by('slug').values_list(
+            'id', flat=True)),
+        'image': image,
+        'image_variants': variants,
+    }
+
+
+def init_worker(plan):
+    """Set up a worker process, or the current one, to generate rows."""
+    global _plan
+    _plan = plan
+    _popularity.cache_clear()
+    _user_ids.cache_clear()
+    _recipe_ids.cache_clear()
+
+
+def tasks(kind):
+    """Return the chunks of a kind of rows as worker tasks."""
+    total = _plan['recipes'] if kind == 'recipes' else _plan['users']
+    return [(kind, chunk) for chunk in range(
+        (total + CHUNK_SIZE - 1) // CHUNK_SIZE)]
+
+
+def _chunk_range(chunk, total):
+    return range(chunk * CHUNK_SIZE, min((chunk + 1) * CHUNK_SIZE, total))
+
+
+def _users(chunk):
+    rng = _rng('users', chunk)
+    fake = _faker()
+    fake.seed_instance(rng.random())
+    rows = []
+    for index in _chunk_range(chunk, _plan['users']):
+        username = f'{_username_prefix()}{index}_{fake.user_name()}'
+        rows.append(User(
+            username=username,
+            email=f'{username}@{fake.free_email_domain()}',
+            first_name=fake.first_name(),
+            last_name=fake.last_name(),
+            password=_plan['password'],
+            date_joined=_date(rng, index, _plan['users']),
+        ))
+    User.objects.bulk_create(rows)
+    return len(rows)
+
+
+def _recipes(chunk):
+    rng = _rng('recipes', chunk)
+    fake = _faker()
+    fake.seed_instance(rng.random())
+    catalog = _plan['catalog']
+    tag_ids = _plan['tag_ids']
+    user_ids = _user_ids()
+    recipes, amounts, tags = [], [], []
+    for index in _chunk_range(chunk, _plan['recipes']):
+        date = _date(rng, index, _plan['recipes'])
+        ingredients = rng.sample(catalog, rng.randint(
+            _plan['min_ingredients'], _plan['max_ingredients']))
+        snapshot = []
+        recipe_amounts = []
+        for ingredient_id, name, measurement_unit in ingredients:
+            amount = rng.randint(1, MAX_GENERATED_AMOUNT)
+            recipe_amounts.append(IngredientInRecipe(
+                ingredient_id=ingredient_id, amount=amount))
+            snapshot.append({'id': ingredient_id, 'name': name,
+                             'measurement_unit': measurement_unit,
+                             'amount': amount})
+        recipe_tags = []
+        if tag_ids:
+            recipe_tags = [
+                Recipe.tags.through(tag_id=tag_id)
+                for tag_id in rng.sample(tag_ids, rng.randint(
+                    1, min(MAX_TAGS_PER_RECIPE, len(tag_ids))))]
+        author_id, = _draw(rng, 'authors', user_ids, 1)
+        recipes.append(Recipe(
+            author_id=author_id,
+            name=fake.sentence(nb_words=3)[:MAX_TAG_NAME],
+            text=fake.paragraph(nb_sentences=5),
+            cooking_time=rng.randint(1, MAX_GENERATED_COOKING_TIME),
+            image=_plan['image'],
+            image_variants=_plan['image_variants'],
+            ingredients_snapshot=snapshot,
+            date=date,
+            updated_at=date,
+        ))
+        amounts.append(recipe_amounts)
+        tags.append(recipe_tags)
+    with _explicit_dates():
+        Recipe.objects.bulk_create(recipes)
+    recipe_ids = _generated_recipes().filter(
+        date__range=(recipes[0].date, recipes[-1].date)).values_list(
+        'id', flat=True)
+    for recipe_id, rows in zip(recipe_ids, zip(amounts, tags)):
+        for row in chain(*rows):
+            row.recipe_id = recipe_id
+    IngredientInRecipe.objects.bulk_create(chain(*amounts))
+    Recipe.tags.through.objects.bulk_create(chain(*tags))
+    return len(recipes)
+
+
+def _links(chunk):
+    rng = _rng('links', chunk)
+    users = _plan['users']
+    user_ids, recipe_ids = _user_ids(), _recipe_ids()
+    favorites, carts, subscriptions = [], [], []
+    for index in _chunk_range(chunk, users):
+        user_id = user_ids[index]
+        favorites.extend(
+            Favorite(user_id=user_id, recipe_id=recipe_id)
+            for recipe_id in _draw(
+                rng, 'recipes', recipe_ids,
+                _share(_plan['favorites'], users, index)))
+        carts.extend(
+            ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+            for recipe_id in _draw(
+                rng, 'recipes', recipe_ids,
+                _share(_plan['carts'], users, index)))
+        subscriptions.extend(
+            Subscription(subscriber_id=user_id, author_id=author_id)
+            for author_id in _draw(
+                rng, 'authors', user_ids,
+                _share(_plan['subscriptions'], users, index),
+                exclude=user_id))
+    Favorite.objects.bulk_create(favorites, ignore_conflicts=True)
+    ShoppingCart.objects.bulk_create(carts, ignore_conflicts=True)
+    Subscription.objects.bulk_create(subscriptions, ignore_conflicts=True)
+    return len(favorites) + len(carts) + len(subscriptions)
+
+
+GENERATORS = {
+    'users': _users,
+    'recipes': _recipes,
+    'links': _links,
+}
+
+
+def run(task):
+    """Generate and insert the rows of a chunk, return their number."""
+    kind, chunk = task
+    with transaction.atomic():
+        return GENERATORS[kind](chunk)
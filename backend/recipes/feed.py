@@ -0,0 +1,130 @@
+"""Per-subscriber timelines of the recipes of followed authors.
+
+A published recipe is written to the timeline of every subscriber of its
+author in the background, and each timeline is trimmed to FEED_MAX_LENGTH
+entries, so reading a page of the feed never joins the subscriptions.
+
+Entries are copied from the subscriptions by INSERT ... SELECT, so a
+subscription removed meanwhile never gets entries back. On PostgreSQL the
+copied subscriptions are locked FOR SHARE, which makes an unsubscription
+wait for the copy and purge what it wrote.
+"""
+from django.db import connection, transaction
+
+from constants import FEED_MAX_LENGTH
+from foodgram import tasks
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription
+
+BATCH_SIZE = 500
+
+
+def _tables():
+    quote = connection.ops.quote_name
+    return {
+        'feed': quote(FeedEntry._meta.db_table),
+        'recipe': quote(Recipe._meta.db_table),
+        'subscription': quote(Subscription._meta.db_table),
+        'lock': ('FOR SHARE OF s' if connection.vendor == 'postgresql'
+                 else ''),
+    }
+
+
+def _copy(select, params):
+    """Insert the (subscriber, recipe, author, date) rows of a SELECT.
+
+    Return the ids of the subscribers who got new entries.
+    """
+    sql = (
+        'INSERT INTO {feed} (subscriber_id, recipe_id, author_id, date) '
+        f'{select} '
+        'ON CONFLICT (subscriber_id, recipe_id) DO NOTHING '
+        'RETURNING subscriber_id'
+    ).format(**_tables())
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {subscriber_id for subscriber_id, in cursor.fetchall()}
+
+
+def trim(subscriber_ids):
+    """Drop the oldest entries of the timelines longer than the limit.
+
+    The timelines are ranked and trimmed by one DELETE per batch of
+    subscribers.
+    """
+    subscriber_ids = list(subscriber_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(subscriber_ids), BATCH_SIZE):
+            batch = subscriber_ids[start:start + BATCH_SIZE]
+            cursor.execute(
+                'DELETE FROM {feed} WHERE id IN ('
+                'SELECT id FROM (SELECT id, ROW_NUMBER() OVER ('
+                'PARTITION BY subscriber_id ORDER BY date DESC, id DESC'
+                ') AS position FROM {feed} WHERE subscriber_id IN ({ids})'
+                ') ranked WHERE position > %s)'.format(
+                    ids=', '.join(['%s'] * len(batch)), **_tables()),
+                [*batch, FEED_MAX_LENGTH])
+
+
+def fan_out(recipe_id):
+    """Add a recipe to the timelines of the subscribers of its author."""
+    with transaction.atomic():
+        trim(_copy(
+            'SELECT s.subscriber_id, r.id, r.author_id, r.date '
+            'FROM {subscription} s '
+            'JOIN {recipe} r ON r.author_id = s.author_id '
+            'WHERE r.id = %s {lock}',
+            (recipe_id,)))
+
+
+def backfill(subscriber_id, author_id):
+    """Add the latest recipes of a newly followed author to a timeline."""
+    with transaction.atomic():
+        trim(_copy(
+            'SELECT s.subscriber_id, r.id, r.author_id, r.date '
+            'FROM {subscription} s '
+            'JOIN {recipe} r ON r.author_id = s.author_id '
+            'WHERE s.subscriber_id = %s AND s.author_id = %s '
+            'ORDER BY r.date DESC, r.id DESC LIMIT %s {lock}',
+            (subscriber_id, author_id, FEED_MAX_LENGTH)))
+
+
+def purge(subscriber_id, author_id):
+    """Remove the recipes of an unfollowed author from a timeline."""
+    FeedEntry.objects.filter(subscriber_id=subscriber_id,
+                             author_id=author_id).delete()
+
+
+def schedule_fan_out(recipe_id):
+    """Fan a recipe out in the background after the commit."""
+    tasks.run_after_commit(fan_out, recipe_id)
+
+
+def schedule_backfill(subscriber_id, author_id):
+    """Backfill a timeline in the background after the commit."""
+    tasks.run_after_commit(backfill, subscriber_id, author_id)
+
+
+def rebuild():
+    """Refill every timeline from the current subscriptions.
+
+    The latest recipes of every author are joined to the subscriptions and
+    ranked per subscriber by a single INSERT ... SELECT.
+    """
+    with transaction.atomic():
+        FeedEntry.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {feed} (subscriber_id, recipe_id, author_id, '
+                'date) SELECT subscriber_id, id, author_id, date FROM ('
+                'SELECT s.subscriber_id, r.id, r.author_id, r.date, '
+                'ROW_NUMBER() OVER (PARTITION BY s.subscriber_id '
+                'ORDER BY r.date DESC, r.id DESC) AS position '
+                'FROM {subscription} s JOIN ('
+                'SELECT id, author_id, date, ROW_NUMBER() OVER ('
+                'PARTITION BY author_id ORDER BY date DESC, id DESC'
+                ') AS position FROM {recipe}'
+                ') r ON r.author_id = s.author_id AND r.position <= %s'
+                ') ranked WHERE position <= %s'.format(**_tables()),
+                (FEED_MAX_LENGTH, FEED_MAX_LENGTH))
+    return FeedEntry.objects.count()
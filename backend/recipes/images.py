@@ -0,0 +1,157 @@
+"""Resized WebP variants of recipe images.
+
+Uploads are stored as they come and the variants are rendered afterwards
+by the background workers. Each variant is bounded to a square box,
+rotated according to its EXIF orientation and saved without metadata.
+"""
+import io
+import logging
+import os
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Now
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from foodgram import tasks
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES = {
+    'thumb': 160,
+    'card': 480,
+    'full': 1280,
+}
+VARIANTS_DIR = 'recipes/variants'
+WEBP_QUALITY = 80
+# Files written or reused more recently are never released: the recipe
+# storing them may not be committed yet. clean_media collects them later.
+RELEASE_GRACE = timedelta(minutes=60)
+
+
+def variant_name(image_name, variant):
+    """Return the storage name of a variant of an image."""
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'{VARIANTS_DIR}/{stem}_{variant}.webp'
+
+
+def render(image, size):
+    """Return the WebP bytes of an image fitted into a size x size box."""
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.LANCZOS)
+    buffer = io.BytesIO()
+    variant.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def make_variants(image_name):
+    """Render and store every variant of an image, return their names."""
+    with default_storage.open(image_name) as file:
+        with Image.open(file) as original:
+            image = ImageOps.exif_transpose(original)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert(
+                    'RGBA' if 'transparency' in image.info
+                    or image.mode in ('LA', 'P') else 'RGB')
+            variants = {}
+            for variant, size in VARIANT_SIZES.items():
+                variants[variant] = default_storage.save(
+                    variant_name(image_name, variant),
+                    ContentFile(render(image, size)))
+    return variants
+
+
+def delete_files(names):
+    """Delete stored files, ignoring the missing ones."""
+    for name in names:
+        default_storage.delete(name)
+
+
+def is_referenced(name):
+    """Tell whether a recipe uses a file as its image or a variant."""
+    lookups = Q(image=name)
+    for variant in VARIANT_SIZES:
+        lookups |= Q(**{f'image_variants__{variant}': name})
+    return Recipe.objects.filter(lookups).exists()
+
+
+def delete_unused(names, cutoff):
+    """Delete the files no recipe uses that are older than cutoff.
+
+    Saves reusing a file refresh its modification time under the lock of
+    the storage, so both checks are made under it, right before deleting.
+    Return the names of the deleted files.
+    """
+    with default_storage.lock(), transaction.atomic():
+        unused = [
+            name for name in names
+            if default_storage.exists(name)
+            and default_storage.get_modified_time(name) < cutoff
+            and not is_referenced(name)
+        ]
+        delete_files(unused)
+    return unused
+
+
+def release(image_name, variant_names=()):
+    """Delete an image and its variants once no recipe uses them.
+
+    Stored files are named by their content, so recipes uploading the same
+    photo share the image, and different photos may render the same
+    variant. A file is kept while a recipe refers to it or while it is
+    younger than RELEASE_GRACE.
+    """
+    delete_unused((image_name, *variant_names),
+                  timezone.now() - RELEASE_GRACE)
+
+
+def schedule_release(image_name, variant_names=()):
+    """Release an image after the commit."""
+    if image_name:
+        names = list(variant_names)
+        transaction.on_commit(lambda: release(image_name, names))
+
+
+def process(recipe_id):
+    """Render the variants of the current image of a recipe."""
+    recipe = Recipe.objects.filter(id=recipe_id).values('image').first()
+    if recipe is None or not recipe['image']:
+        return
+    try:
+        variants = make_variants(recipe['image'])
+    except (OSError, Image.DecompressionBombError):
+        logger.exception('Cannot render variants of %s.', recipe['image'])
+        return
+    updated = Recipe.objects.filter(
+        id=recipe_id, image=recipe['image']).update(
+        image_variants=variants, updated_at=Now())
+    if not updated:
+        release(recipe['image'], variants.values())
+
+
+def replace_image(recipe_id, previous_image):
+    """Forget the variants of a replaced image and release the image."""
+    previous = Recipe.objects.filter(id=recipe_id).values_list(
+        'image_variants', flat=True).first() or {}
+    if previous:
+        Recipe.objects.filter(id=recipe_id).update(image_variants={})
+    schedule_release(previous_image, previous.values())
+
+
+def schedule(recipe_id):
+    """Render the variants of a recipe in the background after the commit."""
+    tasks.run_after_commit(process, recipe_id)
+
+
+def variant_urls(variants, request=None):
+    """Return the URLs of the variants, absolute when a request is given."""
+    urls = {}
+    for variant, name in variants.items():
+        url = default_storage.url(name)
+        urls[variant] = request.build_absolute_uri(url) if request else url
+    return urls
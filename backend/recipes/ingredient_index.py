@@ -0,0 +1,198 @@
+"""Memory-mapped prefix index of the ingredient catalog.
+
+The index is a single read-only file shared by every worker:
+
+    header   magic, format version, number of records
+    offsets  one uint32 per record, pointing at the record
+    records  id, key, name and measurement unit of an ingredient
+
+Records are sorted by key, the lowercased UTF-8 name, so a prefix lookup is
+a binary search over the offsets followed by a forward scan. The file is
+replaced atomically on rebuild and workers remap it when it changes.
+
+Catalog changes request a build in the background; the requests of a burst
+of changes are served by a single build.
+"""
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+from foodgram import tasks
+from recipes.models import Ingredient
+
+MAGIC = b'FGIX'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sII')
+OFFSET = struct.Struct('<I')
+RECORD = struct.Struct('<QHHH')
+BUILD_DELAY = 1
+
+_current = None
+_build_lock = threading.Lock()
+_build_pending = False
+_local = threading.local()
+
+
+def make_key(value):
+    return value.lower().encode()
+
+
+def build(path=None):
+    """Write the index of the Ingredient table and return its size."""
+    path = path or settings.INGREDIENT_INDEX_PATH
+    rows = sorted(
+        (make_key(name), pk, name.encode(), unit.encode())
+        for pk, name, unit in Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit').iterator()
+    )
+    records = bytearray()
+    offsets = bytearray()
+    base = HEADER.size + OFFSET.size * len(rows)
+    for key, pk, name, unit in rows:
+        offsets += OFFSET.pack(base + len(records))
+        records += RECORD.pack(pk, len(key), len(name), len(unit))
+        records += key + name + unit
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(rows)))
+        file.write(offsets)
+        file.write(records)
+    os.replace(file.name, path)
+    return len(rows)
+
+
+def _build_pending_requests():
+    global _build_pending
+    if not settings.BACKGROUND_TASKS_EAGER:
+        # Let the rest of the burst be committed before reading the table.
+        time.sleep(BUILD_DELAY)
+    with _build_lock:
+        _build_pending = False
+    build()
+
+
+def request_build():
+    """Build the index in the background unless a build is pending."""
+    global _build_pending
+    with _build_lock:
+        if _build_pending:
+            return
+        _build_pending = True
+    tasks.run(_build_pending_requests)
+
+
+def schedule_build():
+    """Request a build once the current transaction is committed."""
+    if not getattr(_local, 'deferred', 0):
+        transaction.on_commit(request_build)
+
+
+@contextmanager
+def deferred_builds():
+    """Ignore the builds requested by catalog changes inside the block.
+
+    Bulk loads use it and build the index once they are done.
+    """
+    _local.deferred = getattr(_local, 'deferred', 0) + 1
+    try:
+        yield
+    finally:
+        _local.deferred -= 1
+
+
+class IngredientIndex:
+    """Read-only view over an index file."""
+
+    def __init__(self, path):
+        """Map the index file and check its header."""
+        with open(path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        magic, version, self.count = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'{path} is not an ingredient index.')
+
+    def _offset(self, position):
+        return OFFSET.unpack_from(
+            self.buffer, HEADER.size + OFFSET.size * position)[0]
+
+    def _key(self, position):
+        offset = self._offset(position)
+        key_length = RECORD.unpack_from(self.buffer, offset)[1]
+        start = offset + RECORD.size
+        return self.buffer[start:start + key_length]
+
+    def _record(self, position):
+        offset = self._offset(position)
+        pk, key_length, name_length, unit_length = RECORD.unpack_from(
+            self.buffer, offset)
+        start = offset + RECORD.size + key_length
+        name = self.buffer[start:start + name_length]
+        start += name_length
+        unit = self.buffer[start:start + unit_length]
+        return {'id': pk, 'name': name.decode(),
+                'measurement_unit': unit.decode()}
+
+    def lower_bound(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def search(self, prefix=''):
+        """Return the ingredients whose name starts with the prefix."""
+        key = make_key(prefix)
+        results = []
+        for position in range(self.lower_bound(key), self.count):
+            if not self._key(position).startswith(key):
+                break
+            results.append(self._record(position))
+        return results
+
+    def records(self):
+        return (self._record(position) for position in range(self.count))
+
+
+def get_index():
+    """Return the index, remapping it when the file has been replaced.
+
+    Return None and request a build in the background when there is no
+    index file yet.
+    """
+    global _current
+    path = settings.INGREDIENT_INDEX_PATH
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        request_build()
+        return None
+    signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if _current is None or _current.signature != signature:
+        _current = IngredientIndex(path)
+    return _current
+
+
+def search_database(prefix=''):
+    """Return the ingredients whose name starts with the prefix."""
+    return list(Ingredient.objects.filter(name__istartswith=prefix).values(
+        'id', 'name', 'measurement_unit').order_by('name'))
+
+
+def search(prefix=''):
+    index = get_index()
+    if index is None:
+        return search_database(prefix)
+    return index.search(prefix)
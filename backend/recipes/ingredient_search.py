@@ -0,0 +1,104 @@
+"""Typo-tolerant ingredient search over a trigram inverted index.
+
+Trigrams follow pg_trgm: every word is lowercased and padded with two
+spaces in front and one behind. Candidates are ranked by the Jaccard
+similarity of their trigram set with the one of the query.
+"""
+import re
+import time
+from array import array
+from collections import defaultdict
+
+from recipes import ingredient_index
+
+SIMILARITY_THRESHOLD = 0.3
+RESULTS_LIMIT = 10
+TIME_BUDGET = 0.005
+
+WORD_RE = re.compile(r'\w+')
+
+_current = {'signature': None, 'index': None}
+
+
+def trigrams(value):
+    """Return the set of trigrams of the words of the value."""
+    result = set()
+    for word in WORD_RE.findall(value.lower()):
+        padded = f'  {word} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to positions in the ingredient index."""
+
+    def __init__(self, records):
+        """Index the names of the records."""
+        self.records = list(records)
+        self.sizes = array('H')
+        postings = defaultdict(lambda: array('I'))
+        for position, record in enumerate(self.records):
+            grams = trigrams(record['name'])
+            self.sizes.append(len(grams))
+            for gram in grams:
+                postings[gram].append(position)
+        self.postings = dict(postings)
+
+    def search(self, query, limit=RESULTS_LIMIT,
+               threshold=SIMILARITY_THRESHOLD, budget=TIME_BUDGET):
+        """Return the records most similar to the query.
+
+        Rare trigrams are scanned first, so when the time budget runs out
+        the most selective postings have already been counted.
+        """
+        grams = trigrams(query)
+        if not grams:
+            return []
+        deadline = time.perf_counter() + budget
+        shared = defaultdict(int)
+        lists = sorted(
+            (self.postings[gram] for gram in grams if gram in self.postings),
+            key=len,
+        )
+        for positions in lists:
+            for position in positions:
+                shared[position] += 1
+            if time.perf_counter() > deadline:
+                break
+        scored = []
+        for position, count in shared.items():
+            similarity = count / (len(grams) + self.sizes[position] - count)
+            if similarity >= threshold:
+                scored.append((-similarity, self.records[position]['name'],
+                               position))
+        scored.sort()
+        return [self.records[position]
+                for _, _, position in scored[:limit]]
+
+
+def get_trigram_index():
+    """Return the trigram index of the current ingredient index.
+
+    Return None while the ingredient index is not built.
+    """
+    index = ingredient_index.get_index()
+    if index is None:
+        return None
+    if _current['signature'] != index.signature:
+        _current.update(signature=index.signature,
+                        index=TrigramIndex(index.records()))
+    return _current['index']
+
+
+def search(query, fuzzy=False):
+    """Return prefix matches, or names similar to the query when fuzzy.
+
+    The fuzzy search only runs when requested, so a name without a prefix
+    match keeps answering an empty list.
+    """
+    if not fuzzy:
+        return ingredient_index.search(query)
+    index = get_trigram_index()
+    if index is None:
+        return ingredient_index.search_database(query)
+    return index.search(query)
@@ -0,0 +1,60 @@
+"""Measure the latency of the fuzzy ingredient search."""
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import ingredient_index, ingredient_search
+
+
+def misspell(name, rng):
+    """Return the name with one random edit."""
+    position = rng.randrange(len(name))
+    letter = rng.choice(name)
+    edit = rng.choice(('delete', 'insert', 'replace', 'swap'))
+    if edit == 'delete':
+        return name[:position] + name[position + 1:]
+    if edit == 'insert':
+        return name[:position] + letter + name[position:]
+    if edit == 'replace':
+        return name[:position] + letter + name[position + 1:]
+    return name[:position] + name[position + 1:position + 2] + name[
+        position:position + 1] + name[position + 2:]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the fuzzy ingredient search on misspelled names.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if ingredient_index.get_index() is None:
+            ingredient_index.build()
+        names = [record['name']
+                 for record in ingredient_index.get_index().records()
+                 if len(record['name']) >= 4]
+        if not names:
+            raise CommandError('The ingredient catalog is empty.')
+        rng = random.Random(options['seed'])
+        queries = [misspell(rng.choice(names), rng)
+                   for _ in range(options['queries'])]
+        index = ingredient_search.get_trigram_index()
+        timings = []
+        found = 0
+        for query in queries:
+            start = time.perf_counter()
+            results = index.search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+            found += bool(results)
+        timings.sort()
+
+        def percentile(value):
+            return timings[min(len(timings) - 1, int(len(timings) * value))]
+
+        self.stdout.write(
+            f'{len(names)} names, {len(queries)} queries, '
+            f'{found / len(queries):.1%} with results\n'
+            f'p50 {percentile(0.5):.3f} ms, p95 {percentile(0.95):.3f} ms, '
+            f'p99 {percentile(0.99):.3f} ms, max {timings[-1]:.3f} ms')
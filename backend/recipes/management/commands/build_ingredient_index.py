@@ -0,0 +1,15 @@
+"""Build the memory-mapped ingredient prefix index."""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes import ingredient_index
+
+
+class Command(BaseCommand):
+    help = 'Build the ingredient prefix index used by autocomplete.'
+
+    def handle(self, *args, **options):
+        count = ingredient_index.build()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {count} ingredients in '
+            f'{settings.INGREDIENT_INDEX_PATH}.'))
@@ -0,0 +1,61 @@
+"""Check that the hot API queries do not scan large tables sequentially.
+
+The pages are fetched through the API views and paginators, so the command
+checks the SQL that is actually sent, and exits with an error when a plan
+reads a large table without an index. Run it against a seeded database.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from recipes import query_plans
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Fail when a hot query plans a sequential scan of a large table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=10000,
+            help='Tables with fewer rows may be scanned sequentially.',
+        )
+
+    def table_sizes(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT relname, reltuples FROM pg_class '
+                    'WHERE relname = ANY(%s)',
+                    ([model._meta.db_table
+                      for model in query_plans.CHECKED_MODELS],))
+                return dict(cursor.fetchall())
+        return {model._meta.db_table: model.objects.count()
+                for model in query_plans.CHECKED_MODELS}
+
+    def handle(self, *args, **options):
+        if connection.vendor not in query_plans.SEQUENTIAL_SCAN:
+            raise CommandError(
+                f'Plans of {connection.vendor} are not supported.')
+        user = (User.objects.filter(shoppingcart__isnull=False).first()
+                or User.objects.first())
+        if user is None:
+            raise CommandError('Seed the database first.')
+        sizes = self.table_sizes()
+        large = {table for table, rows in sizes.items()
+                 if rows >= options['min_rows']}
+        failures = []
+        for name, (sql, params) in query_plans.hot_queries(user).items():
+            plan = query_plans.explain(sql, params)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'-- {name}\n{plan}\n')
+            scanned = query_plans.sequential_scans(plan) & large
+            if scanned:
+                failures.append(f'{name}: {", ".join(sorted(scanned))}')
+        if failures:
+            raise CommandError(
+                'Sequential scans of large tables:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS(
+            f'No sequential scans of tables with {options["min_rows"]}+ '
+            f'rows ({", ".join(sorted(large)) or "none"}).'))
@@ -0,0 +1,59 @@
+"""Delete recipe images that no recipe refers to."""
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.images import RELEASE_GRACE, VARIANTS_DIR, delete_unused
+from recipes.models import Recipe
+
+IMAGES_DIR = 'recipes'
+
+
+class Command(BaseCommand):
+    help = 'Delete stored recipe images and variants used by no recipe.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only list the files that would be deleted.',
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=RELEASE_GRACE // timedelta(minutes=1),
+            help='Keep files younger than this many minutes.',
+        )
+
+    @staticmethod
+    def referenced():
+        names = set()
+        for image, variants in Recipe.objects.values_list(
+                'image', 'image_variants').iterator():
+            names.add(image)
+            names.update(variants.values())
+        return names
+
+    def handle(self, *args, **options):
+        referenced = self.referenced()
+        cutoff = timezone.now() - timedelta(minutes=options['min_age'])
+        orphans = []
+        for directory in (IMAGES_DIR, VARIANTS_DIR):
+            if not default_storage.exists(directory):
+                continue
+            for filename in default_storage.listdir(directory)[1]:
+                name = f'{directory}/{filename}'
+                if (name not in referenced
+                        and default_storage.get_modified_time(name) < cutoff):
+                    orphans.append(name)
+        if options['dry_run']:
+            for name in orphans:
+                self.stdout.write(name)
+        else:
+            # References and ages are checked again under the storage lock.
+            orphans = delete_unused(orphans, cutoff)
+        action = 'Found' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {len(orphans)} unused files.'))
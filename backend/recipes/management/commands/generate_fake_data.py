@@ -0,0 +1,115 @@
+"""Fill the database with a large synthetic dataset."""
+import multiprocessing
+import os
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from recipes import fake_data
+from recipes.models import Ingredient
+
+REBUILD_COMMANDS = (
+    'rebuild_search_index',
+    'repair_shopping_lists',
+    'reconcile_counters',
+    'rebuild_feeds',
+)
+
+
+class Command(BaseCommand):
+    help = ('Generate users, recipes, favorites, carts and subscriptions '
+            'with a skewed popularity, deterministically by seed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--carts', type=int, default=5000)
+        parser.add_argument('--subscriptions', type=int, default=10000)
+        parser.add_argument('--min-ingredients', type=int, default=3)
+        parser.add_argument('--max-ingredients', type=int, default=12)
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Zipf exponent of the popularity of authors and recipes.',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='Period before 2024-01-01 over which the users and '
+                 'recipes are spread.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Worker processes; SQLite always uses one.',
+        )
+        parser.add_argument(
+            '--password',
+            help='Password of the generated users, unusable by default.',
+        )
+        parser.add_argument(
+            '--skip-rebuild',
+            action='store_true',
+            help='Do not rebuild the derived data after the generation.',
+        )
+
+    def validate(self, options):
+        for name in ('users', 'recipes', 'favorites', 'carts',
+                     'subscriptions', 'days'):
+            if options[name] < 0:
+                raise CommandError(f'--{name} cannot be negative.')
+        if not 1 <= options['min_ingredients'] <= options['max_ingredients']:
+            raise CommandError(
+                'Expected 1 <= --min-ingredients <= --max-ingredients.')
+        if options['recipes'] and not options['users']:
+            raise CommandError('Recipes need at least one user.')
+        if options['recipes'] and not Ingredient.objects.exists():
+            raise CommandError(
+                'The ingredient catalog is empty, run load_ingredients.')
+
+    def generate(self, pool, kind):
+        started = time.monotonic()
+        tasks = fake_data.tasks(kind)
+        rows = sum(pool(fake_data.run, tasks) if pool else
+                   map(fake_data.run, tasks))
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{kind}: {rows} rows in {elapsed:.1f}s '
+            f'({rows / max(elapsed, 1e-6):.0f} rows/s)')
+
+    def handle(self, *args, **options):
+        self.validate(options)
+        plan = fake_data.make_plan(
+            options['users'], options['recipes'], options['favorites'],
+            options['carts'], options['subscriptions'],
+            options['min_ingredients'], options['max_ingredients'],
+            options['skew'], options['days'], options['seed'],
+            options['password'],
+        )
+        workers = max(options['workers'] or 1, 1)
+        if connection.vendor == 'sqlite':
+            workers = 1
+        fake_data.init_worker(plan)
+        if workers == 1:
+            for kind in fake_data.GENERATORS:
+                self.generate(None, kind)
+        else:
+            # Forked workers inherit the loaded apps and open their own
+            # connections; an inherited one would be shared by processes.
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(
+                    workers, initializer=fake_data.init_worker,
+                    initargs=(plan,)) as pool:
+                for kind in fake_data.GENERATORS:
+                    self.generate(pool.imap_unordered, kind)
+        if not options['skip_rebuild']:
+            for name in REBUILD_COMMANDS:
+                call_command(name, stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('Fake data generated.'))
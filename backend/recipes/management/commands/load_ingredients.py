@@ -0,0 +1,45 @@
+"""Load the ingredient catalog from a CSV or JSON file."""
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import catalog, ingredient_index
+
+DEFAULT_PATH = os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv')
+
+
+class Command(BaseCommand):
+    help = ('Insert the ingredients of a CSV or JSON file that are not in '
+            'the catalog yet.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=DEFAULT_PATH,
+            help='CSV (name,unit rows) or JSON (array of objects) file.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=catalog.BATCH_SIZE,
+            help='Rows sent to the database at once.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist.')
+        started = time.monotonic()
+        try:
+            read, inserted = catalog.load(catalog.read_rows(path),
+                                          options['batch_size'])
+        except (ValueError, KeyError, TypeError) as error:
+            raise CommandError(f'Cannot read {path}: {error!r}')
+        elapsed = time.monotonic() - started
+        ingredient_index.build()
+        self.stdout.write(self.style.SUCCESS(
+            f'Read {read} rows, inserted {inserted} ingredients in '
+            f'{elapsed:.2f}s ({read / max(elapsed, 1e-6):.0f} rows/s).'))
@@ -0,0 +1,27 @@
+"""Render the resized variants of recipe images."""
+from django.core.management.base import BaseCommand
+
+from recipes import images
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Render the WebP variants of recipe images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Only process recipes without variants.',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if options['missing']:
+            recipes = recipes.filter(image_variants={})
+        total = 0
+        for recipe_id in recipes.values_list('id', flat=True).iterator():
+            images.process(recipe_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed the images of {total} recipes.'))
@@ -0,0 +1,13 @@
+"""Refill the subscription feeds from the subscriptions."""
+from django.core.management.base import BaseCommand
+
+from recipes import feed
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the timelines of every subscriber.'
+
+    def handle(self, *args, **options):
+        total = feed.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the feeds with {total} entries.'))
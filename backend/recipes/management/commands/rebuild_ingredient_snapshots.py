@@ -0,0 +1,59 @@
+"""Rebuild or verify the denormalized ingredient snapshots of recipes."""
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from recipes import cache
+from recipes.models import IngredientInRecipe, Recipe
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ingredients snapshot stored on every recipe.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report recipes with an outdated snapshot.',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.only(
+            'id', 'ingredients_snapshot', 'updated_at'
+        ).order_by('id').prefetch_related(Prefetch(
+            'ingredients_in_recipe',
+            queryset=IngredientInRecipe.objects.select_related(
+                'ingredient').order_by('id'),
+        ))
+        checked = outdated = 0
+        last_id = 0
+        while True:
+            batch = list(recipes.filter(id__gt=last_id)[:BATCH_SIZE])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            checked += len(batch)
+            changed = []
+            for recipe in batch:
+                snapshot = Recipe.make_ingredients_snapshot(
+                    recipe.ingredients_in_recipe.all())
+                if snapshot != recipe.ingredients_snapshot:
+                    recipe.ingredients_snapshot = snapshot
+                    recipe.updated_at = timezone.now()
+                    changed.append(recipe)
+            outdated += len(changed)
+            if changed and not options['check']:
+                Recipe.objects.bulk_update(
+                    changed, ('ingredients_snapshot', 'updated_at'))
+                cache.bump_recipes(recipe.id for recipe in changed)
+        if options['check']:
+            if outdated:
+                raise CommandError(
+                    f'{outdated} of {checked} recipes have an outdated '
+                    'ingredients snapshot.')
+            self.stdout.write(f'All {checked} snapshots are up to date.')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} recipes, rebuilt {outdated} snapshots.'))
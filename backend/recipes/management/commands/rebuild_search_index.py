@@ -0,0 +1,12 @@
+"""Rebuild the full-text search index of recipes."""
+from django.core.management.base import BaseCommand
+
+from recipes import search
+
+
+class Command(BaseCommand):
+    help = 'Reindex the name and text of every recipe for full-text search.'
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
@@ -0,0 +1,30 @@
+"""Check and repair the denormalized counters."""
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import counters
+
+
+class Command(BaseCommand):
+    help = ('Recount favorites, carts, recipes and followers counters that '
+            'drifted from the rows they count.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report the counters that drifted.',
+        )
+
+    def handle(self, *args, **options):
+        drifted = counters.reconcile(check=options['check'])
+        for name, total in drifted.items():
+            if total:
+                self.stdout.write(f'{name}: {total} rows drifted')
+        total = sum(drifted.values())
+        if options['check']:
+            if total:
+                raise CommandError(f'{total} counters drifted.')
+            self.stdout.write('All counters are consistent.')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled {total} counters.'))
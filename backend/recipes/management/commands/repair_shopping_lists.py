@@ -0,0 +1,60 @@
+"""Check and repair the aggregated shopping lists."""
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import shopping_list
+from recipes.models import ShoppingCart, ShoppingListItem
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = 'Recompute the shopping lists that differ from the carts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report users with an inconsistent shopping list.',
+        )
+
+    @staticmethod
+    def user_ids():
+        return sorted(
+            set(ShoppingCart.objects.values_list('user_id', flat=True))
+            | set(ShoppingListItem.objects.values_list('user_id', flat=True))
+        )
+
+    @staticmethod
+    def inconsistent(user_ids):
+        expected = defaultdict(dict)
+        for user_id, ingredient_id, total in shopping_list.totals(user_ids):
+            expected[user_id][ingredient_id] = total
+        stored = defaultdict(dict)
+        for user_id, ingredient_id, amount in ShoppingListItem.objects.filter(
+                user__in=user_ids).values_list(
+                'user_id', 'ingredient_id', 'amount'):
+            stored[user_id][ingredient_id] = amount
+        return [user_id for user_id in user_ids
+                if expected[user_id] != stored[user_id]]
+
+    def handle(self, *args, **options):
+        user_ids = self.user_ids()
+        broken = []
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            batch = self.inconsistent(user_ids[start:start + BATCH_SIZE])
+            if batch and not options['check']:
+                shopping_list.refresh(batch)
+            broken += batch
+        if options['check']:
+            if broken:
+                raise CommandError(
+                    f'{len(broken)} of {len(user_ids)} shopping lists are '
+                    'inconsistent.')
+            self.stdout.write(
+                f'All {len(user_ids)} shopping lists are consistent.')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {len(user_ids)} shopping lists, repaired '
+            f'{len(broken)}.'))
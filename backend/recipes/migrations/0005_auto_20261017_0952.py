@@ -0,0 +1,49 @@
+# Generated by Django 3.2.16 on 2026-10-17 06:52
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def fill_ingredients_snapshots(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    IngredientInRecipe = apps.get_model('recipes', 'IngredientInRecipe')
+    snapshots = {}
+    rows = IngredientInRecipe.objects.select_related('ingredient').order_by(
+        'id')
+    for item in rows.iterator():
+        snapshots.setdefault(item.recipe_id, []).append({
+            'id': item.ingredient.id,
+            'name': item.ingredient.name,
+            'measurement_unit': item.ingredient.measurement_unit,
+            'amount': item.amount,
+        })
+    for recipe_id, snapshot in snapshots.items():
+        Recipe.objects.filter(id=recipe_id).update(
+            ingredients_snapshot=snapshot)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_auto_20231117_1048'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients_snapshot',
+            field=models.JSONField(default=list, editable=False, verbose_name='Ingredients Snapshot'),
+        ),
+        migrations.AlterField(
+            model_name='ingredientinrecipe',
+            name='amount',
+            field=models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1, message='Value should be at least 1!'), django.core.validators.MaxValueValidator(32767, message='Value should be less then 32767!')], verbose_name='Ingriedient Amount'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='cooking_time',
+            field=models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1, message='Value should be at least 1!'), django.core.validators.MaxValueValidator(1000, message='Value should be less then 1000!')], verbose_name='Cooking Time'),
+        ),
+        migrations.RunPython(fill_ingredients_snapshots,
+                             migrations.RunPython.noop),
+    ]
@@ -1,10 +1,12 @@
 """Module for Django models used in the recipes app."""
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import (MinValueValidator,
                                     RegexValidator,
                                     MaxValueValidator)
-from django.db import models
+from django.db import connection, models
+from django.dispatch import Signal
 
-from users.models import User
+from users.models import ManagedFieldsMixin, User
 from constants import (MAX_TAG_NAME,
                        MAX_LENGTH_COLOR,
                        MINIMUM_INGREDIENTS,
@@ -12,6 +14,10 @@ from constants import (MAX_TAG_NAME,
                        MAX_AMOUNT,
                        MIN_AMOUNT)
 
+ingredients_changed = Signal()
+user_recipes_added = Signal()
+user_recipes_removed = Signal()
+
 
 class Tag(models.Model):
     """Tag model."""
@@ -73,9 +79,12 @@ class Ingredient(models.Model):
         return f'{self.name} {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class Recipe(ManagedFieldsMixin, models.Model):
     """Recipe model."""
 
+    managed_fields = ('favorites_count', 'in_carts_count',
+                      'image_variants')
+
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -121,15 +130,98 @@ class Recipe(models.Model):
         verbose_name='Publication Date',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Update Date',
+        auto_now=True,
+        db_index=True,
+    )
+    ingredients_snapshot = models.JSONField(
+        verbose_name='Ingredients Snapshot',
+        default=list,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Search Vector',
+        null=True,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Favorites Count',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='In Carts Count',
+        default=0,
+        editable=False,
+    )
+    image_variants = models.JSONField(
+        verbose_name='Image Variants',
+        default=dict,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Recipe'
         verbose_name_plural = 'Recipes'
         ordering = ('-date',)
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='recipe_date_id_idx'),
+            models.Index(fields=['author', '-date'],
+                         name='recipe_author_date_idx'),
+            models.Index(fields=['-favorites_count', '-id'],
+                         name='recipe_favorites_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded image name to detect a new upload."""
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_image = instance.__dict__.get('image')
+        return instance
+
+    @staticmethod
+    def make_ingredients_snapshot(recipe_ingredients):
+        """Return the read representation of the recipe ingredients."""
+        return [
+            {
+                'id': item.ingredient.id,
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe_ingredients
+        ]
+
+    def build_ingredients_snapshot(self):
+        """Build the ingredients snapshot from the IngredientInRecipe rows."""
+        return self.make_ingredients_snapshot(
+            self.ingredients_in_recipe.select_related(
+                'ingredient').order_by('id')
+        )
+
+    def refresh_ingredients_snapshot(self):
+        """Rebuild and store the ingredients snapshot.
+
+        Sends ingredients_changed with the amount differences of the
+        ingredients whose amount changed, was added or was removed.
+        """
+        old = {item['id']: item['amount']
+               for item in self.ingredients_snapshot}
+        self.ingredients_snapshot = self.build_ingredients_snapshot()
+        self.save(update_fields=('ingredients_snapshot', 'updated_at'))
+        new = {item['id']: item['amount']
+               for item in self.ingredients_snapshot}
+        changes = {pk: new.get(pk, 0) - old.get(pk, 0)
+                   for pk in old.keys() | new.keys()
+                   if old.get(pk) != new.get(pk)}
+        if changes:
+            ingredients_changed.send(sender=Recipe, recipe=self,
+                                     changes=changes)
+
 
 class IngredientInRecipe(models.Model):
     """Ingredients in Recipe model."""
@@ -165,11 +257,70 @@ class IngredientInRecipe(models.Model):
         verbose_name_plural = 'Ingredients in Recipe'
         constraints = [models.UniqueConstraint(fields=['recipe', 'ingredient'],
                                                name='ingredient_recipe')]
+        indexes = [
+            models.Index(fields=['recipe', 'ingredient', 'amount'],
+                         name='ingredient_recipe_amount_idx'),
+        ]
 
     def __str__(self):
         return f'{self.ingredient.name} {self.amount}'
 
 
+class UserRecipeQuerySet(models.QuerySet):
+    """Bulk operations on the favorites or the cart of a user."""
+
+    def _execute(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return {recipe_id for recipe_id, in cursor.fetchall()}
+
+    def add_many(self, user, recipe_ids):
+        """Add the recipes, return the ids of existing and added ones.
+
+        The added ids are the rows the INSERT actually created, so recipes
+        added concurrently by another request are not counted twice.
+        """
+        existing = set(Recipe.objects.filter(
+            id__in=recipe_ids).values_list('id', flat=True))
+        if not existing:
+            return existing, set()
+        quote = connection.ops.quote_name
+        added = self._execute(
+            f'INSERT INTO {quote(self.model._meta.db_table)} '
+            '(user_id, recipe_id) '
+            f'SELECT %s, id FROM {quote(Recipe._meta.db_table)} '
+            f'WHERE id IN ({", ".join(["%s"] * len(existing))}) '
+            'ON CONFLICT (user_id, recipe_id) DO NOTHING '
+            'RETURNING recipe_id',
+            [user.id, *existing])
+        if added:
+            user_recipes_added.send(sender=self.model, user_id=user.id,
+                                    recipe_ids=added)
+        return existing, added
+
+    def remove_many(self, user, recipe_ids=None):
+        """Remove the recipes or all of them, return the removed ids.
+
+        The rows are removed by a single DELETE, followed by one
+        user_recipes_removed signal instead of a post_delete per row.
+        """
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        sql = f'DELETE FROM {table} WHERE user_id = %s'
+        params = [user.id]
+        if recipe_ids is not None:
+            recipe_ids = list(recipe_ids)
+            if not recipe_ids:
+                return set()
+            sql += (' AND recipe_id IN '
+                    f'({", ".join(["%s"] * len(recipe_ids))})')
+            params += recipe_ids
+        removed = self._execute(sql + ' RETURNING recipe_id', params)
+        if removed:
+            user_recipes_removed.send(sender=self.model, user_id=user.id,
+                                      recipe_ids=removed)
+        return removed
+
+
 class AbstractUserXRecipe(models.Model):
     user = models.ForeignKey(
         User,
@@ -182,6 +333,8 @@ class AbstractUserXRecipe(models.Model):
         on_delete=models.CASCADE
     )
 
+    objects = UserRecipeQuerySet.as_manager()
+
     class Meta:
         abstract = True
 
@@ -207,3 +360,95 @@ class ShoppingCart(AbstractUserXRecipe):
         verbose_name_plural = 'Items in Shopping Cart'
         constraints = [models.UniqueConstraint(fields=['user', 'recipe'],
                                                name='cart_recipe')]
+
+
+class ShoppingListItem(models.Model):
+    """Total amount of an ingredient in the shopping cart of a user."""
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='User',
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ingredient',
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Total Amount',
+    )
+
+    class Meta:
+        verbose_name = 'Shopping List Item'
+        verbose_name_plural = 'Shopping List Items'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'],
+                                    name='shopping_list_ingredient')
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.ingredient} {self.amount}'
+
+
+class FeedEntry(models.Model):
+    """Recipe in the timeline of a subscriber of its author."""
+
+    subscriber = models.ForeignKey(
+        User,
+        verbose_name='Subscriber',
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Recipe',
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Author',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    date = models.DateTimeField(
+        verbose_name='Publication Date',
+    )
+
+    class Meta:
+        verbose_name = 'Feed Entry'
+        verbose_name_plural = 'Feed Entries'
+        constraints = [
+            models.UniqueConstraint(fields=['subscriber', 'recipe'],
+                                    name='feed_subscriber_recipe')
+        ]
+        indexes = [
+            models.Index(fields=['subscriber', '-date', '-id'],
+                         name='feed_subscriber_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.subscriber} {self.recipe}'
+
+
+class CacheVersion(models.Model):
+    """Current version of a group of cached recipe fragments."""
+
+    key = models.CharField(
+        verbose_name='Key',
+        max_length=100,
+        primary_key=True,
+    )
+    version = models.BigIntegerField(
+        verbose_name='Version',
+    )
+
+    class Meta:
+        verbose_name = 'Cache Version'
+        verbose_name_plural = 'Cache Versions'
+
+    def __str__(self):
+        return f'{self.key} {self.version}'
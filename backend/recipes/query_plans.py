@@ -0,0 +1,107 @@
+"""Plans of the hot API queries.
+
+Pages are fetched through the views and paginators of the API and their
+SQL is captured, so the plans are those of the queries actually sent,
+keyset conditions included.
+"""
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipes.api.views import RecipesViewSet
+from recipes.models import (Favorite, FeedEntry, IngredientInRecipe, Recipe,
+                            ShoppingCart, ShoppingListItem, Tag)
+from users.api.views import UserViewSet
+from users.models import Subscription, User
+
+SEQUENTIAL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (?:TABLE )?(\w+)\b(?! USING)'),
+}
+CHECKED_MODELS = (Recipe, IngredientInRecipe, Favorite, ShoppingCart,
+                  ShoppingListItem, FeedEntry, Subscription, User,
+                  Recipe.tags.through)
+
+
+def explain(sql, params=None):
+    """Return the plan of a statement as text."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}',
+                       params)
+        return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+
+def sequential_scans(plan):
+    """Return the tables read sequentially by a plan."""
+    return set(SEQUENTIAL_SCAN[connection.vendor].findall(plan))
+
+
+def fetch_page(view_class, action, user, query=None, queryset=None):
+    """Fetch a page through the paginator of a view.
+
+    queryset builds the paginated queryset from the view, the filtered
+    queryset of the view is used by default. Return the SQL of the page
+    query, None when no page query was sent, the paginator and the page.
+    """
+    request = Request(APIRequestFactory().get('/', query or {}))
+    request.user = user
+    view = view_class(request=request, action=action, format_kwarg=None,
+                      kwargs={})
+    if queryset is None:
+        queryset = view.filter_queryset(view.get_queryset())
+    else:
+        queryset = queryset(view)
+    with CaptureQueriesContext(connection) as queries:
+        page = view.paginate_queryset(queryset)
+    # The page is selected after the count of page number pagination and
+    # before the prefetches.
+    sql = next((query['sql'] for query in queries.captured_queries
+                if not query['sql'].startswith('SELECT COUNT(')), None)
+    return sql, view.paginator, page
+
+
+def hot_queries(user):
+    """Return the (SQL, params) of the hot API queries of a user by name.
+
+    Pages that are known to be empty from their count are not selected, so
+    their queries are left out.
+    """
+    recipe = Recipe.objects.order_by('-date', '-id').first()
+    tag = Tag.objects.first()
+    word = recipe.name.split()[0] if recipe else 'recipe'
+    recipe_queries = {
+        'recipe list': {},
+        'recipes by author': {'author': recipe.author_id if recipe else 0},
+        'recipes by tag': {'tags': tag.slug} if tag else {},
+        'favorited recipes': {'is_favorited': 1},
+        'recipes in cart': {'is_in_shopping_cart': 1},
+        'recipe search': {'search': word},
+    }
+    pages = {
+        name: fetch_page(RecipesViewSet, 'list', user, query)[0]
+        for name, query in recipe_queries.items()
+    }
+    _, paginator, page = fetch_page(RecipesViewSet, 'list', user,
+                                    {'paginate': 'cursor'})
+    if page:
+        pages['recipe cursor page'] = fetch_page(
+            RecipesViewSet, 'list', user,
+            {'cursor': paginator.keyset.cursor(page[-1])})[0]
+    pages['subscriptions'] = fetch_page(
+        UserViewSet, 'subscriptions', user,
+        queryset=lambda view: view.filter_queryset(
+            User.objects.filter(authors__subscriber=user)))[0]
+    pages['feed'] = fetch_page(
+        RecipesViewSet, 'feed', user,
+        queryset=lambda view: FeedEntry.objects.filter(
+            subscriber=user).only('id', 'date', 'recipe_id').order_by(
+            '-date', '-id'))[0]
+    queries = {name: (sql, None) for name, sql in pages.items()
+               if sql is not None}
+    queries['shopping list'] = user.shopping_list.values(
+        'ingredient__name', 'ingredient__measurement_unit', 'amount'
+    ).order_by('ingredient__name').query.sql_with_params()
+    return queries
@@ -0,0 +1,92 @@
+"""Full-text search over the name and text of recipes.
+
+PostgreSQL keeps a weighted tsvector in Recipe.search_vector with a GIN
+index. SQLite keeps the same columns in an FTS5 virtual table whose rowid is
+the recipe id. Other databases fall back to a case-insensitive scan.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+from recipes.models import Recipe
+
+FTS_TABLE = 'recipes_recipe_fts'
+INDEXED_FIELDS = {'name', 'text'}
+WORD_RE = re.compile(r'\w+')
+
+
+def search_vector():
+    config = settings.RECIPE_SEARCH_CONFIG
+    return (SearchVector('name', weight='A', config=config)
+            + SearchVector('text', weight='B', config=config))
+
+
+def update_recipe(recipe):
+    """Index the current name and text of the recipe."""
+    if connection.vendor == 'postgresql':
+        Recipe.objects.filter(id=recipe.id).update(
+            search_vector=search_vector())
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           (recipe.id,))
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+                'VALUES (%s, %s, %s)',
+                (recipe.id, recipe.name, recipe.text))
+
+
+def delete_recipe(recipe_id):
+    """Remove a deleted recipe from the index."""
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           (recipe_id,))
+
+
+def rebuild():
+    """Reindex every recipe."""
+    if connection.vendor == 'postgresql':
+        Recipe.objects.update(search_vector=search_vector())
+    elif connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, text) '
+                f'SELECT id, name, text FROM {Recipe._meta.db_table}')
+
+
+def fts5_query(value):
+    """Turn user input into an FTS5 query of quoted prefix terms."""
+    return ' '.join(
+        '"{}"*'.format(word.replace('"', '""'))
+        for word in WORD_RE.findall(value)
+    )
+
+
+def search(queryset, value):
+    """Filter the recipes matching the query, best matches first."""
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(value, config=settings.RECIPE_SEARCH_CONFIG,
+                            search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-date')
+    if connection.vendor == 'sqlite':
+        match = fts5_query(value)
+        if not match:
+            return queryset.none()
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (match,),
+        )).annotate(search_rank=RawSQL(
+            f'SELECT -rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = {Recipe._meta.db_table}.id',
+            (match,),
+        )).order_by('-search_rank', '-date')
+    return queryset.filter(Q(name__icontains=value) | Q(text__icontains=value))
@@ -0,0 +1,121 @@
+"""Per-user aggregated shopping lists.
+
+ShoppingListItem keeps the total amount of every ingredient in the cart of
+a user. Cart and recipe changes apply the differences of the amounts to the
+affected (user, ingredient) rows, in the transaction of the change:
+increments are upserted, decrements go through F() and the rows reaching
+zero are dropped. Lists are recomputed from the carts only to repair them.
+"""
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from recipes.models import (IngredientInRecipe, Recipe, ShoppingCart,
+                            ShoppingListItem)
+from users.models import User
+
+BATCH_SIZE = 300
+
+
+def totals(user_ids, ingredient_ids=None):
+    """Return the (user id, ingredient id, amount) totals of the carts."""
+    rows = IngredientInRecipe.objects.filter(
+        recipe__shoppingcart__user__in=user_ids)
+    if ingredient_ids is not None:
+        rows = rows.filter(ingredient__in=ingredient_ids)
+    return rows.values_list(
+        'recipe__shoppingcart__user', 'ingredient'
+    ).annotate(total=Sum('amount')).order_by()
+
+
+def refresh(user_ids, ingredient_ids=None):
+    """Recompute the shopping list rows of the users from their carts.
+
+    Only the rows of the given ingredients are recomputed when they are
+    passed, every row of the users otherwise.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    with transaction.atomic():
+        # Serialize concurrent refreshes of the same users.
+        list(User.objects.select_for_update().filter(
+            id__in=user_ids).values_list('id', flat=True))
+        stale = ShoppingListItem.objects.filter(user__in=user_ids)
+        if ingredient_ids is not None:
+            stale = stale.filter(ingredient__in=ingredient_ids)
+        stale.delete()
+        ShoppingListItem.objects.bulk_create(
+            ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id,
+                             amount=total)
+            for user_id, ingredient_id, total in totals(user_ids,
+                                                        ingredient_ids)
+        )
+
+
+def _increment(rows):
+    table = connection.ops.quote_name(ShoppingListItem._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, ingredient_id, amount) '
+                f'VALUES {", ".join(["(%s, %s, %s)"] * len(batch))} '
+                'ON CONFLICT (user_id, ingredient_id) DO UPDATE '
+                f'SET amount = {table}.amount + excluded.amount',
+                [value for row in batch for value in row])
+
+
+def _decrement(user_ids, amounts):
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        rows = ShoppingListItem.objects.filter(
+            user__in=user_ids[start:start + BATCH_SIZE],
+            ingredient__in=amounts)
+        rows.update(amount=Greatest(F('amount') - Case(*(
+            When(ingredient_id=ingredient_id, then=Value(amount))
+            for ingredient_id, amount in amounts.items()
+        )), 0))
+        rows.filter(amount=0).delete()
+
+
+def apply(deltas):
+    """Add the amount deltas to the rows of (user id, ingredient id) keys."""
+    increments = [(user_id, ingredient_id, delta)
+                  for (user_id, ingredient_id), delta in deltas.items()
+                  if delta > 0]
+    decrements = defaultdict(dict)
+    for (user_id, ingredient_id), delta in deltas.items():
+        if delta < 0:
+            decrements[user_id][ingredient_id] = -delta
+    # Users losing the same amounts, such as the holders of an edited
+    # recipe, are updated together.
+    groups = defaultdict(list)
+    for user_id, amounts in decrements.items():
+        groups[frozenset(amounts.items())].append(user_id)
+    with transaction.atomic():
+        if increments:
+            _increment(increments)
+        for amounts, user_ids in groups.items():
+            _decrement(user_ids, dict(amounts))
+
+
+def change_cart(user_id, recipe_ids, sign):
+    """Add (sign=1) or remove (sign=-1) recipes to the list of a user."""
+    deltas = defaultdict(int)
+    for snapshot in Recipe.objects.filter(id__in=recipe_ids).values_list(
+            'ingredients_snapshot', flat=True):
+        for item in snapshot:
+            deltas[user_id, item['id']] += sign * item['amount']
+    apply(deltas)
+
+
+def change_recipe(recipe_id, changes):
+    """Apply the amount changes of a recipe to the lists of its carts."""
+    user_ids = ShoppingCart.objects.filter(recipe_id=recipe_id).values_list(
+        'user_id', flat=True)
+    apply({(user_id, ingredient_id): delta
+           for user_id in user_ids
+           for ingredient_id, delta in changes.items() if delta})
@@ -0,0 +1,281 @@
+"""Signal handlers keeping denormalized recipe data in sync."""
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from recipes import (cache, counters, feed, images, ingredient_index,
+                     search, shopping_list)
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, Tag, ingredients_changed,
+                            user_recipes_added, user_recipes_removed)
+from users.models import Subscription, User
+
+
+def touch_recipes(**filters):
+    """Bump updated_at of the recipes matching the filters."""
+    Recipe.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Ingredient)
+def refresh_snapshots_on_ingredient_change(sender, instance, created,
+                                           **kwargs):
+    """Rebuild the snapshots of the recipes using an edited ingredient."""
+    if created:
+        return
+    for recipe in Recipe.objects.filter(ingredients=instance).distinct():
+        recipe.refresh_ingredients_snapshot()
+
+
+@receiver(pre_delete, sender=Ingredient)
+def collect_recipes_of_deleted_ingredient(sender, instance, **kwargs):
+    """Remember the recipes using an ingredient before the cascade."""
+    instance.affected_recipe_ids = list(Recipe.objects.filter(
+        ingredients=instance).values_list('id', flat=True).distinct())
+
+
+@receiver(post_delete, sender=Ingredient)
+def refresh_snapshots_on_ingredient_delete(sender, instance, **kwargs):
+    """Drop a deleted ingredient from the snapshots of its recipes."""
+    recipe_ids = getattr(instance, 'affected_recipe_ids', ())
+    for recipe in Recipe.objects.filter(id__in=recipe_ids):
+        recipe.refresh_ingredients_snapshot()
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def rebuild_ingredient_index(sender, **kwargs):
+    """Rebuild the ingredient prefix index after a catalog change."""
+    ingredient_index.schedule_build()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_fragment(sender, instance, created=False, **kwargs):
+    """Drop the cached fragment of a saved or deleted recipe."""
+    cache.bump_recipes((instance.id,))
+    if not created:
+        cache.bump_recipes_collection()
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_index(sender, instance, update_fields, **kwargs):
+    """Reindex a recipe whose name or text may have changed."""
+    if update_fields and not search.INDEXED_FIELDS & set(update_fields):
+        return
+    search.update_recipe(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_from_search_index(sender, instance, **kwargs):
+    """Remove a deleted recipe from the search index."""
+    search.delete_recipe(instance.id)
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def invalidate_fragment_on_ingredients_change(sender, instance, **kwargs):
+    """Drop the cached fragment when the ingredients of a recipe change."""
+    touch_recipes(id=instance.recipe_id)
+    cache.bump_recipes((instance.recipe_id,))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_fragment_on_tags_change(sender, instance, action, reverse,
+                                       pk_set, **kwargs):
+    """Drop the cached fragments of recipes whose tags changed."""
+    if not action.startswith('post_'):
+        return
+    cache.bump_recipes_collection()
+    if not reverse:
+        touch_recipes(id=instance.id)
+        cache.bump_recipes((instance.id,))
+    elif pk_set:
+        touch_recipes(id__in=pk_set)
+        cache.bump_recipes(pk_set)
+    else:
+        touch_recipes(tags=instance)
+        cache.bump_tags()
+
+
+@receiver(post_save, sender=Tag)
+def invalidate_fragments_on_tag_change(sender, instance, **kwargs):
+    """Drop every cached fragment when the tag catalog changes."""
+    touch_recipes(tags=instance)
+    cache.bump_tags()
+    cache.bump_recipes_collection()
+
+
+@receiver(pre_delete, sender=Tag)
+def collect_recipes_of_deleted_tag(sender, instance, **kwargs):
+    """Remember the recipes of a tag before its links are deleted."""
+    instance.affected_recipe_ids = list(
+        instance.recipes.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def invalidate_fragments_on_tag_delete(sender, instance, **kwargs):
+    """Touch the recipes that lost a deleted tag."""
+    touch_recipes(id__in=getattr(instance, 'affected_recipe_ids', ()))
+    cache.bump_tags()
+    cache.bump_recipes_collection()
+
+
+@receiver(post_save, sender=User)
+def invalidate_fragments_on_author_change(sender, instance, created,
+                                          update_fields, **kwargs):
+    """Drop the cached fragments of the recipes of an edited user."""
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    touch_recipes(author=instance)
+    cache.bump_user(instance.id)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def bump_state_on_user_recipe_change(sender, instance, **kwargs):
+    """Mark a change of the favorites or the cart of a user."""
+    cache.bump_user_state(instance.user_id)
+
+
+@receiver(user_recipes_added, sender=Favorite)
+@receiver(user_recipes_added, sender=ShoppingCart)
+@receiver(user_recipes_removed, sender=Favorite)
+@receiver(user_recipes_removed, sender=ShoppingCart)
+def bump_state_on_bulk_change(sender, user_id, **kwargs):
+    """Mark a bulk change of the favorites or the cart of a user."""
+    cache.bump_user_state(user_id)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def bump_state_on_subscription_change(sender, instance, **kwargs):
+    """Mark a change of the subscriptions of a user."""
+    cache.bump_user_state(instance.subscriber_id)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_recipe_to_shopping_list(sender, instance, created, **kwargs):
+    """Add the ingredients of a recipe put in the cart."""
+    if created:
+        shopping_list.change_cart(instance.user_id, (instance.recipe_id,), 1)
+
+
+@receiver(user_recipes_added, sender=ShoppingCart)
+def add_recipes_to_shopping_list(sender, user_id, recipe_ids, **kwargs):
+    """Add the ingredients of recipes put in the cart in bulk."""
+    shopping_list.change_cart(user_id, recipe_ids, 1)
+
+
+@receiver(user_recipes_removed, sender=ShoppingCart)
+def remove_recipes_from_shopping_list(sender, user_id, recipe_ids, **kwargs):
+    """Subtract the ingredients of recipes removed from the cart in bulk."""
+    shopping_list.change_cart(user_id, recipe_ids, -1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_recipe_from_shopping_list(sender, instance, **kwargs):
+    """Subtract the ingredients of a recipe removed from the cart."""
+    shopping_list.change_cart(instance.user_id, (instance.recipe_id,), -1)
+
+
+@receiver(ingredients_changed, sender=Recipe)
+def refresh_shopping_lists(sender, recipe, changes, **kwargs):
+    """Update the shopping lists of the carts holding an edited recipe."""
+    shopping_list.change_recipe(recipe.id, changes)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    """Count a recipe added to the favorites or a cart."""
+    if created:
+        counters.change(Recipe.objects.filter(id=instance.recipe_id),
+                        counters.RECIPE_COUNTERS[sender], 1)
+
+
+@receiver(user_recipes_removed, sender=Favorite)
+@receiver(user_recipes_removed, sender=ShoppingCart)
+def decrement_recipe_counters(sender, recipe_ids, **kwargs):
+    """Uncount recipes removed from the favorites or a cart in bulk."""
+    counters.change(Recipe.objects.filter(id__in=recipe_ids),
+                    counters.RECIPE_COUNTERS[sender], -1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    """Uncount a recipe removed from the favorites or a cart."""
+    counters.change(Recipe.objects.filter(id=instance.recipe_id),
+                    counters.RECIPE_COUNTERS[sender], -1)
+
+
+@receiver(user_recipes_added, sender=Favorite)
+@receiver(user_recipes_added, sender=ShoppingCart)
+def increment_recipe_counters(sender, recipe_ids, **kwargs):
+    """Count recipes added to the favorites or a cart in bulk."""
+    counters.change(Recipe.objects.filter(id__in=recipe_ids),
+                    counters.RECIPE_COUNTERS[sender], 1)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def change_recipes_count(sender, instance, created=False, **kwargs):
+    """Count a published or deleted recipe of its author."""
+    if created or kwargs['signal'] is post_delete:
+        counters.change(User.objects.filter(id=instance.author_id),
+                        'recipes_count', 1 if created else -1)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def change_followers_count(sender, instance, created=False, **kwargs):
+    """Count a new or cancelled follower of an author."""
+    if created or kwargs['signal'] is post_delete:
+        counters.change(User.objects.filter(id=instance.author_id),
+                        'followers_count', 1 if created else -1)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    """Add a published recipe to the feeds of the author's subscribers."""
+    if created:
+        feed.schedule_fan_out(instance.id)
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_feed(sender, instance, created, **kwargs):
+    """Add the recipes of a followed author to the subscriber's feed."""
+    if created:
+        feed.schedule_backfill(instance.subscriber_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def purge_feed(sender, instance, **kwargs):
+    """Remove the recipes of an unfollowed author from the feed."""
+    feed.purge(instance.subscriber_id, instance.author_id)
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(sender, instance, created, update_fields, **kwargs):
+    """Render the variants of a newly uploaded recipe image."""
+    if update_fields and 'image' not in update_fields:
+        return
+    loaded_image = getattr(instance, 'loaded_image', None)
+    if not instance.image or (
+            not created and instance.image.name == loaded_image):
+        return
+    if not created:
+        images.replace_image(instance.id, loaded_image)
+        instance.image_variants = {}
+    instance.loaded_image = instance.image.name
+    images.schedule(instance.id)
+
+
+@receiver(pre_delete, sender=Recipe)
+def release_recipe_image(sender, instance, **kwargs):
+    """Delete the image of a deleted recipe unless another recipe uses it."""
+    images.schedule_release(instance.image.name,
+                            instance.image_variants.values())
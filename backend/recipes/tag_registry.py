@@ -0,0 +1,48 @@
+"""Per-process registry of the tag catalog.
+
+Every worker keeps the whole tag table in memory and reloads it only when
+the shared tags version in the cache changes, which happens when a Tag is
+saved or deleted.
+"""
+from recipes import cache
+from recipes.models import Tag
+
+_registry = {'version': None, 'tags': (), 'by_id': {}, 'by_slug': {}}
+
+
+def _load():
+    version = cache.get_versions(
+        (cache.TAGS_VERSION_KEY,))[cache.TAGS_VERSION_KEY]
+    if version != _registry['version']:
+        tags = tuple(Tag.objects.all())
+        _registry.update(
+            version=version,
+            tags=tags,
+            by_id={tag.id: tag for tag in tags},
+            by_slug={tag.slug: tag for tag in tags},
+        )
+    return _registry
+
+
+def all_tags():
+    """Return every tag ordered by name."""
+    return _load()['tags']
+
+
+def get_tag(pk):
+    """Return the tag with the given id or None."""
+    try:
+        return _load()['by_id'].get(int(pk))
+    except (TypeError, ValueError):
+        return None
+
+
+def ids_by_slugs(slugs):
+    """Return the ids of the tags with the given slugs."""
+    by_slug = _load()['by_slug']
+    return [by_slug[slug].id for slug in slugs if slug in by_slug]
+
+
+def slug_choices():
+    """Return the (slug, name) choices of the tag filter."""
+    return [(tag.slug, tag.name) for tag in all_tags()]
@@ -6,10 +6,10 @@ To run it, use the following command:
 python manage.py runscript database_script
 """
 
-import csv
 import os
 
-from recipes.models import Ingredient, Tag
+from recipes import catalog, ingredient_index
+from recipes.models import Tag
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -22,13 +22,8 @@ TAGS_DATA = [
 
 
 def load_ingredients_from_csv(file_path):
-    with open(file_path, encoding='utf8') as csv_file:
-        ingredients = csv.reader(csv_file)
-        Ingredient.objects.all().delete()
-
-        for name, measurement_unit in ingredients:
-            Ingredient.objects.get_or_create(name=name,
-                                             measurement_unit=measurement_unit)
+    catalog.load(catalog.read_rows(file_path))
+    ingredient_index.build()
 
 
 def fill_tags():
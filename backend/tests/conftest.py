@@ -0,0 +1,109 @@
+import io
+
+import pytest
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes import feed
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Subscription, User
+
+RECIPES_PER_AUTHOR = 20
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 24), 'orange').save(buffer, 'PNG')
+    return default_storage.save('recipes/soup.png',
+                                ContentFile(buffer.getvalue()))
+
+
+def make_user(name):
+    return User.objects.create_user(
+        username=name, email=f'{name}@example.com', password='password',
+        first_name=name.title(), last_name=name.title())
+
+
+def client_of(user=None):
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def user():
+    return make_user('reader')
+
+
+@pytest.fixture
+def authors():
+    return [make_user(f'author{index}') for index in range(3)]
+
+
+@pytest.fixture
+def tags():
+    return [Tag.objects.create(name=name, slug=name, color=color)
+            for name, color in (('breakfast', '#E26C2D'),
+                                ('lunch', '#49B64E'))]
+
+
+@pytest.fixture
+def ingredients():
+    return [Ingredient.objects.create(name=f'ingredient {index}',
+                                      measurement_unit='g')
+            for index in range(5)]
+
+
+@pytest.fixture
+def recipe(authors, tags, ingredients, image):
+    """Return a recipe of the first author with two ingredients."""
+    recipe = Recipe.objects.create(
+        author=authors[0], name='Porridge', text='Boil the oats.',
+        cooking_time=10, image=image)
+    recipe.tags.set(tags[:1])
+    IngredientInRecipe.objects.bulk_create(
+        IngredientInRecipe(recipe=recipe, ingredient=ingredient, amount=100)
+        for ingredient in ingredients[:2])
+    recipe.refresh_ingredients_snapshot()
+    return recipe
+
+
+@pytest.fixture
+def recipes(authors, tags, ingredients, image):
+    recipes = []
+    for author in authors:
+        for index in range(RECIPES_PER_AUTHOR):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Soup {author.id} {index}',
+                text='Boil the water.', cooking_time=10,
+                image=image)
+            recipe.tags.set(tags[:index % 2 + 1])
+            IngredientInRecipe.objects.create(
+                recipe=recipe, ingredient=ingredients[index % 5], amount=100)
+            recipe.refresh_ingredients_snapshot()
+            recipes.append(recipe)
+    return recipes
+
+
+@pytest.fixture
+def reader(user, authors, recipes):
+    """Return a user with favorites, a cart, subscriptions and a feed."""
+    for recipe in recipes[::3]:
+        Favorite.objects.create(user=user, recipe=recipe)
+    for recipe in recipes[::7]:
+        ShoppingCart.objects.create(user=user, recipe=recipe)
+    for author in authors[:2]:
+        Subscription.objects.create(subscriber=user, author=author)
+        feed.backfill(user.id, author.id)
+    return user
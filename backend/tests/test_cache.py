@@ -0,0 +1,140 @@
+import pytest
+from django.db import transaction
+
+from recipes import cache
+from recipes.models import Favorite, Recipe, ShoppingCart
+from tests.conftest import client_of, make_user
+from users.models import Subscription
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def fragment_key(recipe):
+    recipe = Recipe.objects.get(id=recipe.id)
+    return cache.fragment_keys([recipe])[recipe.id]
+
+
+def cached_fragment(recipe):
+    recipe = Recipe.objects.get(id=recipe.id)
+    keys = cache.fragment_keys([recipe])
+    return cache.get_fragments([recipe], keys).get(recipe.id)
+
+
+def get_recipe(recipe, user=None):
+    response = client_of(user).get(f'/api/recipes/{recipe.id}/')
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_fragment_is_stored_and_reused(recipe):
+    assert cached_fragment(recipe) is None
+    first = get_recipe(recipe)
+    assert cached_fragment(recipe)['name'] == 'Porridge'
+    assert get_recipe(recipe) == first
+
+
+def test_recipe_edit_invalidates_fragment(recipe, ingredients):
+    get_recipe(recipe)
+    key = fragment_key(recipe)
+    response = client_of(recipe.author).patch(
+        f'/api/recipes/{recipe.id}/', {
+            'name': 'Oatmeal',
+            'text': 'Boil the oats.',
+            'cooking_time': 5,
+            'tags': [tag.id for tag in recipe.tags.all()],
+            'ingredients': [{'id': ingredients[0].id, 'amount': 50}],
+        }, format='json')
+    assert response.status_code == 200
+    assert fragment_key(recipe) != key
+    data = get_recipe(recipe)
+    assert data['name'] == 'Oatmeal'
+    assert [item['amount'] for item in data['ingredients']] == [50]
+
+
+def test_ingredient_edit_invalidates_fragment(recipe, ingredients):
+    get_recipe(recipe)
+    key = fragment_key(recipe)
+    ingredients[0].name = 'rolled oats'
+    ingredients[0].save()
+    assert fragment_key(recipe) != key
+    names = {item['name'] for item in get_recipe(recipe)['ingredients']}
+    assert 'rolled oats' in names
+
+
+def test_tag_edit_invalidates_fragment(recipe, tags):
+    get_recipe(recipe)
+    key = fragment_key(recipe)
+    tags[0].name = 'brunch'
+    tags[0].save()
+    assert fragment_key(recipe) != key
+    assert [tag['name'] for tag in get_recipe(recipe)['tags']] == ['brunch']
+
+
+def test_author_edit_invalidates_fragment(recipe):
+    get_recipe(recipe)
+    key = fragment_key(recipe)
+    recipe.author.first_name = 'Renamed'
+    recipe.author.save()
+    assert fragment_key(recipe) != key
+    assert get_recipe(recipe)['author']['first_name'] == 'Renamed'
+
+
+def test_user_fields_are_not_shared(recipe):
+    fan, stranger = make_user('fan'), make_user('stranger')
+    Favorite.objects.create(user=fan, recipe=recipe)
+    ShoppingCart.objects.create(user=fan, recipe=recipe)
+    Subscription.objects.create(subscriber=fan, author=recipe.author)
+    seen_by_fan = get_recipe(recipe, fan)
+    assert cached_fragment(recipe) is not None
+    seen_by_stranger = get_recipe(recipe, stranger)
+    seen_anonymously = get_recipe(recipe)
+    assert seen_by_fan['is_favorited'] is True
+    assert seen_by_fan['is_in_shopping_cart'] is True
+    assert seen_by_fan['author']['is_subscribed'] is True
+    for data in (seen_by_stranger, seen_anonymously):
+        assert data['is_favorited'] is False
+        assert data['is_in_shopping_cart'] is False
+        assert data['author']['is_subscribed'] is False
+
+
+def test_user_fields_are_not_stored_in_fragment(recipe):
+    fan = make_user('fan')
+    Favorite.objects.create(user=fan, recipe=recipe)
+    get_recipe(recipe, fan)
+    assert get_recipe(recipe)['is_favorited'] is False
+    assert get_recipe(recipe, fan)['is_favorited'] is True
+
+
+def test_list_fragments_are_not_shared(recipe):
+    fan = make_user('fan')
+    Favorite.objects.create(user=fan, recipe=recipe)
+    client_of(fan).get('/api/recipes/')
+    results = client_of().get('/api/recipes/').json()['results']
+    assert [item['is_favorited'] for item in results] == [False]
+
+
+def test_bump_waits_for_commit(recipe):
+    key = cache.RECIPE_VERSION_KEY.format(recipe.id)
+    version = cache.get_versions([key])[key]
+    with transaction.atomic():
+        cache.bump_recipes([recipe.id])
+        assert cache.get_versions([key])[key] == version
+    assert cache.get_versions([key])[key] != version
+
+
+def test_bump_is_dropped_on_rollback(recipe):
+    key = cache.RECIPE_VERSION_KEY.format(recipe.id)
+    version = cache.get_versions([key])[key]
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            cache.bump_recipes([recipe.id])
+            raise RuntimeError
+    assert cache.get_versions([key])[key] == version
+
+
+def test_versions_are_never_reused():
+    versions = cache.get_versions(['a', 'b'])
+    cache.bump_versions(['a'])
+    bumped = cache.get_versions(['a', 'b'])
+    assert bumped['a'] > versions['a']
+    assert bumped['b'] == versions['b']
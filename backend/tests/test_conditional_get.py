@@ -0,0 +1,186 @@
+import time
+
+import pytest
+
+from recipes.models import Favorite, Recipe
+from tests.conftest import client_of, make_user
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+LIST_URL = '/api/recipes/'
+
+
+def detail_url(recipe):
+    return f'/api/recipes/{recipe.id}/'
+
+
+def next_second():
+    """Wait for the next second, the resolution of Last-Modified."""
+    time.sleep(1 - time.time() % 1 + 0.01)
+
+
+def edit(recipe, name):
+    response = client_of(recipe.author).patch(detail_url(recipe), {
+        'name': name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'tags': [tag.id for tag in recipe.tags.all()],
+        'ingredients': [{'id': item['id'], 'amount': item['amount']}
+                        for item in recipe.ingredients_snapshot],
+    }, format='json')
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('url', [LIST_URL, None])
+def test_not_modified_on_matching_etag(recipe, url):
+    url = url or detail_url(recipe)
+    client = client_of()
+    response = client.get(url)
+    assert response.status_code == 200
+    assert 'Authorization' in response['Vary']
+    cached = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert cached.status_code == 304
+    assert cached['ETag'] == response['ETag']
+
+
+@pytest.mark.parametrize('url', [LIST_URL, None])
+def test_not_modified_since_last_modified(recipe, url):
+    url = url or detail_url(recipe)
+    client = client_of()
+    response = client.get(url)
+    cached = client.get(
+        url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+    assert cached.status_code == 304
+
+
+@pytest.mark.parametrize('url', [LIST_URL, None])
+def test_modified_after_edit(recipe, url):
+    url = url or detail_url(recipe)
+    client = client_of()
+    response = client.get(url)
+    next_second()
+    edit(recipe, 'Oatmeal')
+    by_etag = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert by_etag.status_code == 200
+    assert 'Oatmeal' in by_etag.content.decode()
+    by_date = client.get(
+        url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+    assert by_date.status_code == 200
+
+
+@pytest.mark.parametrize('url', [LIST_URL, None])
+def test_modified_after_tag_change(recipe, tags, url):
+    url = url or detail_url(recipe)
+    client = client_of()
+    response = client.get(url)
+    next_second()
+    tags[0].name = 'brunch'
+    tags[0].save()
+    by_etag = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert by_etag.status_code == 200
+    assert 'brunch' in by_etag.content.decode()
+    by_date = client.get(
+        url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+    assert by_date.status_code == 200
+
+
+def test_list_modified_after_tag_delete(recipe, tags):
+    client = client_of()
+    response = client.get(LIST_URL, {'tags': tags[0].slug})
+    assert response.json()['count'] == 1
+    tags[0].delete()
+    changed = client.get(LIST_URL, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert changed.status_code == 200
+
+
+def test_list_modified_after_delete(recipe, authors, image):
+    older = Recipe.objects.create(
+        author=authors[1], name='Soup', text='Boil the water.',
+        cooking_time=20, image=image)
+    client = client_of()
+    response = client.get(LIST_URL)
+    assert response.json()['count'] == 2
+    next_second()
+    assert client_of(authors[1]).delete(
+        detail_url(older)).status_code == 204
+    by_etag = client.get(LIST_URL, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert by_etag.status_code == 200
+    assert by_etag.json()['count'] == 1
+    by_date = client.get(
+        LIST_URL, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+    assert by_date.status_code == 200
+
+
+def test_detail_gone_after_delete(recipe):
+    client = client_of()
+    response = client.get(detail_url(recipe))
+    assert client_of(recipe.author).delete(
+        detail_url(recipe)).status_code == 204
+    gone = client.get(detail_url(recipe),
+                      HTTP_IF_NONE_MATCH=response['ETag'])
+    assert gone.status_code == 404
+
+
+@pytest.mark.parametrize('pk', ['abc', '999999'])
+def test_unknown_recipe_is_not_found(recipe, pk):
+    assert client_of().get(f'/api/recipes/{pk}/').status_code == 404
+
+
+@pytest.mark.parametrize('url', [LIST_URL, None])
+def test_user_state_is_part_of_etag(recipe, url):
+    url = url or detail_url(recipe)
+    fan = make_user('fan')
+    anonymous = client_of().get(url)
+    response = client_of(fan).get(url)
+    assert response['ETag'] != anonymous['ETag']
+    assert 'Authorization' in response['Vary']
+    # Flags of a user are not reflected in updated_at.
+    assert not response.has_header('Last-Modified')
+    cached = client_of(fan).get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert cached.status_code == 304
+    assert 'Authorization' in cached['Vary']
+    Favorite.objects.create(user=fan, recipe=recipe)
+    changed = client_of(fan).get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert changed.status_code == 200
+    assert '"is_favorited":true' in changed.content.decode()
+
+
+def test_etag_of_one_user_does_not_match_another(recipe):
+    fan, stranger = make_user('fan'), make_user('stranger')
+    response = client_of(fan).get(detail_url(recipe))
+    other = client_of(stranger).get(
+        detail_url(recipe), HTTP_IF_NONE_MATCH=response['ETag'])
+    assert other.status_code == 200
+
+
+@pytest.mark.parametrize('url', [LIST_URL, None])
+def test_modified_after_counter_change(recipe, url):
+    url = url or detail_url(recipe)
+    fan, reader = make_user('fan'), make_user('reader')
+    for client in (client_of(), client_of(reader)):
+        response = client.get(url)
+        next_second()
+        assert client_of(fan).post(
+            f'/api/recipes/{recipe.id}/favorite/').status_code == 201
+        by_etag = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert by_etag.status_code == 200
+        assert '"favorites_count":1' in by_etag.content.decode()
+        if response.has_header('Last-Modified'):
+            by_date = client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            assert by_date.status_code == 200
+        assert client_of(fan).delete(
+            f'/api/recipes/{recipe.id}/favorite/').status_code == 204
+
+
+def test_detail_etag_ignores_counters_of_other_recipes(recipe, authors,
+                                                       image):
+    other = Recipe.objects.create(
+        author=authors[1], name='Soup', text='Boil the water.',
+        cooking_time=20, image=image)
+    client = client_of()
+    response = client.get(detail_url(recipe))
+    Favorite.objects.create(user=make_user('fan'), recipe=other)
+    cached = client.get(detail_url(recipe),
+                        HTTP_IF_NONE_MATCH=response['ETag'])
+    assert cached.status_code == 304
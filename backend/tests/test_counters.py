@@ -0,0 +1,52 @@
+import pytest
+
+from recipes import counters
+from recipes.models import Favorite, Recipe
+from tests.conftest import make_user
+from users.models import Subscription, User
+
+pytestmark = pytest.mark.django_db
+
+
+def test_stale_recipe_save_keeps_counters(recipe):
+    stale = Recipe.objects.get(id=recipe.id)
+    Favorite.objects.create(user=make_user('fan'), recipe=recipe)
+    stale.name = 'Oatmeal'
+    stale.save()
+    fresh = Recipe.objects.get(id=recipe.id)
+    assert fresh.name == 'Oatmeal'
+    assert fresh.favorites_count == 1
+
+
+def test_stale_user_save_keeps_counters(authors):
+    stale = User.objects.get(id=authors[0].id)
+    Subscription.objects.create(subscriber=authors[1], author=authors[0])
+    stale.first_name = 'Renamed'
+    stale.save()
+    fresh = User.objects.get(id=authors[0].id)
+    assert fresh.first_name == 'Renamed'
+    assert fresh.followers_count == 1
+
+
+def test_deferred_save_writes_loaded_fields(recipe):
+    partial = Recipe.objects.only('id', 'name').get(id=recipe.id)
+    partial.name = 'Oatmeal'
+    partial.save()
+    fresh = Recipe.objects.get(id=recipe.id)
+    assert (fresh.name, fresh.text) == ('Oatmeal', recipe.text)
+
+
+def test_new_instance_is_inserted(authors):
+    user = User(id=5000, username='fresh', email='fresh@example.com',
+                first_name='Fresh', last_name='User')
+    user.save()
+    assert User.objects.filter(id=5000).exists()
+
+
+def test_reconcile_repairs_drift(recipe):
+    Favorite.objects.create(user=make_user('fan'), recipe=recipe)
+    Recipe.objects.filter(id=recipe.id).update(favorites_count=7)
+    assert counters.reconcile(check=True)['recipe.favorites_count'] == 1
+    counters.reconcile()
+    assert Recipe.objects.get(id=recipe.id).favorites_count == 1
+    assert not any(counters.reconcile(check=True).values())
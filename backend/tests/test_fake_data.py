@@ -0,0 +1,70 @@
+import io
+
+import pytest
+from django.core.management import call_command
+
+from recipes import fake_data
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+pytestmark = pytest.mark.django_db
+
+OPTIONS = {'users': 6, 'recipes': 15, 'favorites': 25, 'carts': 8,
+           'subscriptions': 10, 'min_ingredients': 2, 'max_ingredients': 4,
+           'seed': 7, 'workers': 1, 'skip_rebuild': True}
+
+
+def generate(**options):
+    call_command('generate_fake_data', stdout=io.StringIO(),
+                 **{**OPTIONS, **options})
+
+
+def dataset():
+    """Return the generated rows without their primary keys."""
+    prefix = fake_data.USERNAME_PREFIX.format(OPTIONS['seed'])
+    users = User.objects.filter(username__startswith=prefix)
+    recipes = Recipe.objects.filter(author__in=users)
+    return {
+        'users': sorted(users.values_list(
+            'username', 'first_name', 'date_joined')),
+        'recipes': sorted(recipes.values_list(
+            'author__username', 'name', 'date', 'cooking_time',
+            'ingredients_in_recipe__ingredient__name',
+            'ingredients_in_recipe__amount', 'tags__slug')),
+        'favorites': sorted(Favorite.objects.filter(
+            user__in=users).values_list('user__username', 'recipe__date')),
+        'carts': sorted(ShoppingCart.objects.filter(
+            user__in=users).values_list('user__username', 'recipe__date')),
+        'subscriptions': sorted(Subscription.objects.filter(
+            subscriber__in=users).values_list(
+            'subscriber__username', 'author__username')),
+    }
+
+
+@pytest.mark.parametrize('chunk_size', [fake_data.CHUNK_SIZE, 4])
+def test_same_seed_gives_same_data(ingredients, tags, recipe, chunk_size,
+                                   monkeypatch):
+    monkeypatch.setattr(fake_data, 'CHUNK_SIZE', chunk_size)
+    generate()
+    first = dataset()
+    assert len(first['users']) == OPTIONS['users']
+    assert Recipe.objects.count() == OPTIONS['recipes'] + 1
+    assert all(date < fake_data.EPOCH for *_, date in first['users'])
+    User.objects.filter(username__in=[
+        username for username, *_ in first['users']]).delete()
+    # Rows created meanwhile move the primary keys of the next run.
+    Recipe.objects.create(author=recipe.author, name='Soup',
+                          text='Boil the water.', cooking_time=5,
+                          image=recipe.image)
+    generate()
+    assert dataset() == first
+
+
+def test_links_reference_generated_rows(ingredients, tags, recipe):
+    generate()
+    generated = User.objects.filter(username__startswith=(
+        fake_data.USERNAME_PREFIX.format(OPTIONS['seed'])))
+    assert not Favorite.objects.filter(recipe=recipe).exists()
+    assert not Subscription.objects.exclude(
+        author__in=generated).exists()
+    assert Favorite.objects.filter(user__in=generated).exists()
@@ -0,0 +1,37 @@
+import pytest
+
+from recipes import ingredient_index
+from recipes.models import Ingredient
+from tests.conftest import client_of
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/ingredients/'
+
+
+@pytest.fixture
+def catalog():
+    Ingredient.objects.bulk_create(
+        Ingredient(name=name, measurement_unit='g')
+        for name in ('apricot', 'banana', 'buckwheat', 'butter'))
+    ingredient_index.build()
+
+
+def names(response):
+    assert response.status_code == 200
+    return [item['name'] for item in response.json()]
+
+
+def test_prefix_search(catalog):
+    assert names(client_of().get(URL, {'name': 'bu'})) == [
+        'buckwheat', 'butter']
+
+
+def test_typo_without_fuzzy_is_empty(catalog):
+    assert names(client_of().get(URL, {'name': 'bananna'})) == []
+
+
+@pytest.mark.parametrize('flag', ['1', 'true'])
+def test_typo_with_fuzzy(catalog, flag):
+    assert names(client_of().get(
+        URL, {'name': 'bananna', 'fuzzy': flag})) == ['banana']
@@ -0,0 +1,52 @@
+import pytest
+from django.db import connection
+
+from recipes import query_plans
+
+pytestmark = pytest.mark.django_db
+
+CHECKED_TABLES = {model._meta.db_table
+                  for model in query_plans.CHECKED_MODELS}
+EXPECTED_INDEXES = {
+    'recipe list': 'recipe_date_id_idx',
+    'recipe cursor page': 'recipe_date_id_idx',
+    'recipes by author': 'recipe_author_date_idx',
+    'subscriptions': 'subscriber_author_idx',
+    'feed': 'feed_subscriber_date_idx',
+}
+
+
+@pytest.fixture
+def plans(reader):
+    """Return the plans of the hot queries of the reader by name."""
+    if connection.vendor == 'postgresql':
+        # The test tables are tiny, scanning them would always be cheaper.
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+    return {name: query_plans.explain(sql, params)
+            for name, (sql, params)
+            in query_plans.hot_queries(reader).items()}
+
+
+def test_hot_queries_are_checked(plans):
+    assert set(EXPECTED_INDEXES) <= set(plans)
+
+
+def test_no_sequential_scans(plans):
+    scans = {name: query_plans.sequential_scans(plan) & CHECKED_TABLES
+             for name, plan in plans.items()}
+    assert {name: tables for name, tables in scans.items() if tables} == {}
+
+
+@pytest.mark.parametrize('name, index', EXPECTED_INDEXES.items())
+def test_uses_index(plans, name, index):
+    assert index in plans[name]
+
+
+def test_cursor_page_uses_keyset_condition(reader):
+    queries = query_plans.hot_queries(reader)
+    sql, _ = queries['recipe cursor page']
+    first_page, _ = queries['recipe list']
+    assert ' < ' in sql and '"date"' in sql
+    assert ' OFFSET ' not in sql
+    assert sql != first_page
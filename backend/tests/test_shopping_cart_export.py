@@ -0,0 +1,52 @@
+import pytest
+
+from recipes.models import ShoppingCart
+from tests.conftest import client_of, make_user
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+@pytest.fixture
+def shopper(recipe):
+    user = make_user('shopper')
+    ShoppingCart.objects.create(user=user, recipe=recipe)
+    return user
+
+
+def content(response):
+    return b''.join(response.streaming_content).decode()
+
+
+@pytest.mark.parametrize('accept', [None, 'application/json', '*/*',
+                                    'text/plain'])
+def test_text_export_by_default(shopper, accept):
+    headers = {'HTTP_ACCEPT': accept} if accept else {}
+    response = client_of(shopper).get(URL, **headers)
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain')
+    assert 'Ingredient 0 - g (100)' in content(response)
+
+
+@pytest.mark.parametrize('query, accept, content_type', [
+    ({'format': 'csv'}, 'application/json', 'text/csv'),
+    ({}, 'text/csv', 'text/csv'),
+    ({'format': 'pdf'}, None, 'application/pdf'),
+])
+def test_requested_format(shopper, query, accept, content_type):
+    headers = {'HTTP_ACCEPT': accept} if accept else {}
+    response = client_of(shopper).get(URL, query, **headers)
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith(content_type)
+
+
+def test_unknown_format_is_not_found(shopper):
+    assert client_of(shopper).get(
+        URL, {'format': 'xml'}).status_code == 404
+
+
+def test_empty_cart(recipe):
+    response = client_of(make_user('idle')).get(
+        URL, HTTP_ACCEPT='application/json')
+    assert response.status_code == 400
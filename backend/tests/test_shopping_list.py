@@ -0,0 +1,151 @@
+import pytest
+
+from recipes import shopping_list
+from recipes.models import Recipe, ShoppingCart, ShoppingListItem
+from tests.conftest import client_of, make_user
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def shoppers():
+    return [make_user('alice'), make_user('bob')]
+
+
+@pytest.fixture
+def menu(authors, tags, ingredients, image):
+    """Return three recipes sharing some of their ingredients."""
+    recipes = []
+    for index, amounts in enumerate(((100, 50, 0), (30, 0, 20), (0, 5, 5))):
+        response = client_of(authors[index]).post('/api/recipes/', {
+            'name': f'Dish {index}',
+            'text': 'Cook it.',
+            'cooking_time': 10,
+            'tags': [tags[0].id],
+            'image': 'data:image/png;base64,' + PNG,
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient, amount in zip(ingredients, amounts) if amount
+            ],
+        }, format='json')
+        assert response.status_code == 201, response.content
+        recipes.append(Recipe.objects.get(id=response.json()['id']))
+    return recipes
+
+
+PNG = ('iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4nGP4'
+       '//8/AAX+Av4N70a4AAAAAElFTkSuQmCC')
+
+
+def stored(user):
+    return {ingredient_id: amount for ingredient_id, amount
+            in ShoppingListItem.objects.filter(user=user).values_list(
+                'ingredient_id', 'amount')}
+
+
+def recomputed(user):
+    return {ingredient_id: total for _, ingredient_id, total
+            in shopping_list.totals([user.id])}
+
+
+def assert_consistent(*users):
+    for user in users:
+        assert stored(user) == recomputed(user)
+
+
+def put_in_cart(user, recipe):
+    response = client_of(user).post(
+        f'/api/recipes/{recipe.id}/shopping_cart/')
+    assert response.status_code == 201
+
+
+def test_cart_add_and_remove(shoppers, menu, ingredients):
+    alice, bob = shoppers
+    put_in_cart(alice, menu[0])
+    put_in_cart(alice, menu[1])
+    put_in_cart(bob, menu[1])
+    assert stored(alice) == {ingredients[0].id: 130, ingredients[1].id: 50,
+                             ingredients[2].id: 20}
+    assert_consistent(alice, bob)
+    assert client_of(alice).delete(
+        f'/api/recipes/{menu[0].id}/shopping_cart/').status_code == 204
+    assert stored(alice) == {ingredients[0].id: 30, ingredients[2].id: 20}
+    assert_consistent(alice, bob)
+    assert client_of(alice).delete(
+        f'/api/recipes/{menu[1].id}/shopping_cart/').status_code == 204
+    assert stored(alice) == {}
+    assert_consistent(alice, bob)
+
+
+def test_batch_add_and_remove(shoppers, menu):
+    alice, bob = shoppers
+    client = client_of(alice)
+    ids = [recipe.id for recipe in menu]
+    client.post('/api/recipes/shopping_cart/batch/', {'recipes': ids},
+                format='json')
+    client.post('/api/recipes/shopping_cart/batch/', {'recipes': ids[:2]},
+                format='json')
+    assert_consistent(alice)
+    client.delete('/api/recipes/shopping_cart/batch/',
+                  {'recipes': ids[1:]}, format='json')
+    assert_consistent(alice)
+    client.delete('/api/recipes/shopping_cart/clear/')
+    assert stored(alice) == {}
+    assert_consistent(alice, bob)
+
+
+def test_recipe_edit_updates_carts(shoppers, menu, ingredients, tags):
+    alice, bob = shoppers
+    put_in_cart(alice, menu[0])
+    put_in_cart(alice, menu[1])
+    put_in_cart(bob, menu[0])
+    response = client_of(menu[0].author).patch(
+        f'/api/recipes/{menu[0].id}/', {
+            'name': 'Dish 0',
+            'text': 'Cook it.',
+            'cooking_time': 10,
+            'tags': [tags[0].id],
+            'ingredients': [{'id': ingredients[0].id, 'amount': 10},
+                            {'id': ingredients[3].id, 'amount': 7}],
+        }, format='json')
+    assert response.status_code == 200
+    assert stored(bob) == {ingredients[0].id: 10, ingredients[3].id: 7}
+    assert_consistent(alice, bob)
+
+
+def test_recipe_delete_updates_carts(shoppers, menu):
+    alice, bob = shoppers
+    for recipe in menu:
+        put_in_cart(alice, recipe)
+    put_in_cart(bob, menu[2])
+    assert client_of(menu[2].author).delete(
+        f'/api/recipes/{menu[2].id}/').status_code == 204
+    assert stored(bob) == {}
+    assert_consistent(alice, bob)
+
+
+def test_ingredient_delete_updates_carts(shoppers, menu, ingredients):
+    alice, _ = shoppers
+    put_in_cart(alice, menu[0])
+    ingredients[1].delete()
+    assert_consistent(alice)
+
+
+def test_rolled_back_cart_add(shoppers, menu):
+    from django.db import transaction
+
+    alice, _ = shoppers
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            ShoppingCart.objects.create(user=alice, recipe=menu[0])
+            raise RuntimeError
+    put_in_cart(alice, menu[1])
+    assert_consistent(alice)
+
+
+def test_refresh_repairs_drift(shoppers, menu):
+    alice, _ = shoppers
+    put_in_cart(alice, menu[0])
+    ShoppingListItem.objects.filter(user=alice).update(amount=1)
+    shopping_list.refresh([alice.id])
+    assert_consistent(alice)
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+
+from foodgram import storage
+from recipes import images
+from recipes.models import Recipe
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def make_old(name):
+    old = (timezone.now() - images.RELEASE_GRACE * 2).timestamp()
+    os.utime(default_storage.path(name), (old, old))
+
+
+def test_same_content_is_stored_once():
+    first = default_storage.save('recipes/a.txt', ContentFile(b'soup'))
+    second = default_storage.save('recipes/b.TXT', ContentFile(b'soup'))
+    assert first == second
+    assert first.endswith('.txt')
+
+
+def test_reuse_refreshes_modification_time():
+    name = default_storage.save('recipes/a.txt', ContentFile(b'soup'))
+    make_old(name)
+    default_storage.save('recipes/a.txt', ContentFile(b'soup'))
+    age = timezone.now() - default_storage.get_modified_time(name)
+    assert age < images.RELEASE_GRACE
+
+
+def test_file_deleted_before_reuse_is_rewritten(monkeypatch):
+    name = default_storage.save('recipes/a.txt', ContentFile(b'soup'))
+    utime = os.utime
+
+    def delete_then_utime(path, *args, **kwargs):
+        os.remove(path)
+        return utime(path, *args, **kwargs)
+
+    monkeypatch.setattr(storage.os, 'utime', delete_then_utime)
+    assert default_storage.save('recipes/a.txt', ContentFile(b'soup')) == name
+    with default_storage.open(name) as file:
+        assert file.read() == b'soup'
+
+
+def test_release_keeps_young_and_referenced_files(image, authors):
+    young = default_storage.save('recipes/young.txt', ContentFile(b'new'))
+    old = default_storage.save('recipes/old.txt', ContentFile(b'old'))
+    make_old(image)
+    make_old(old)
+    Recipe.objects.create(author=authors[0], name='Soup', text='Boil.',
+                          cooking_time=5, image=image)
+    images.release(image, (young, old))
+    assert default_storage.exists(image)
+    assert default_storage.exists(young)
+    assert not default_storage.exists(old)
+
+
+def test_release_rechecks_under_lock():
+    name = default_storage.save('recipes/a.txt', ContentFile(b'soup'))
+    make_old(name)
+    with default_storage.lock():
+        releasing = threading.Thread(target=images.release, args=(name,))
+        releasing.start()
+        time.sleep(0.2)
+        assert releasing.is_alive()
+        # A save reusing the file while the release waits for the lock.
+        os.utime(default_storage.path(name))
+    releasing.join()
+    assert default_storage.exists(name)
+
+
+def test_clean_media_deletes_old_orphans(image):
+    orphan = default_storage.save('recipes/old.txt', ContentFile(b'old'))
+    make_old(orphan)
+    call_command('clean_media', stdout=open(os.devnull, 'w'))
+    assert not default_storage.exists(orphan)
+    assert default_storage.exists(image)
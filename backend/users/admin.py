@@ -9,22 +9,12 @@ class UserAdmin(BaseUserAdmin):
     """Admin for the User model."""
 
     list_display = ('id', 'email', 'username', 'first_name',
-                    'last_name', 'recipes_count', 'subscriber_count')
+                    'last_name', 'recipes_count', 'followers_count')
     search_fields = ('email', 'username', 'first_name',
                      'last_name')
     list_filter = ('email', 'username', 'first_name', 'last_name')
     ordering = ('id',)
 
-    @admin.display(description='recipes count')
-    def recipes_count(self, obj):
-        """Return number of recipes."""
-        return obj.recipes.count()
-
-    @admin.display(description='subscriber count')
-    def subscriber_count(self, obj):
-        """Return number of subscribers."""
-        return obj.authors.count()
-
 
 @admin.register(Subscription)
 class SubscriptionsAdmin(admin.ModelAdmin):
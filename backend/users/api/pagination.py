@@ -1,8 +1,182 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+
+from django.db import connections, models
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from constants import MAX_PAGE_SIZE, PAGE_SIZE
+
+
+def estimate_count(queryset):
+    """Return the planner row estimate on PostgreSQL, an exact count else."""
+    queryset = queryset.order_by()
+    if connections[queryset.db].vendor == 'postgresql':
+        plan = json.loads(queryset.explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    return queryset.count()
 
 
 class UserPagination(PageNumberPagination):
     """Accepts the 'limit' parameter instead of the default value."""
 
     page_size_query_param = 'limit'
-    page_size = 6
+    page_size = PAGE_SIZE
+    max_page_size = MAX_PAGE_SIZE
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination keyed on a unique ordering such as (date, id).
+
+    Every page is fetched with a WHERE on the last seen key instead of an
+    OFFSET, and no COUNT(*) is run unless 'count=approx' is requested.
+    """
+
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    ordering = ('-date', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(queryset.model, request)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) == 'approx':
+            self.count = estimate_count(queryset)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [self.invert(name) for name in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(ordering, position))
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page = results
+        return results
+
+    @staticmethod
+    def invert(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    def after(self, ordering, position):
+        """Build the condition selecting the rows after the position."""
+        condition = Q()
+        equal = {}
+        for name, value in zip(ordering, position):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def decode_cursor(self, model, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            values = data['p']
+            reverse = bool(data.get('r'))
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = []
+            for name, value in zip(self.fields, values):
+                if isinstance(model._meta.get_field(name),
+                              models.DateTimeField):
+                    value = parse_datetime(value)
+                    if value is None:
+                        raise ValueError
+                position.append(value)
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def cursor(self, instance, reverse=False):
+        """Return the cursor value of the position of an instance."""
+        values = []
+        for name in self.fields:
+            value = getattr(instance, name)
+            values.append(value.isoformat()
+                          if hasattr(value, 'isoformat') else value)
+        data = {'p': values}
+        if reverse:
+            data['r'] = 1
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+    def encode_cursor(self, instance, reverse):
+        return replace_query_param(self.request.build_absolute_uri(),
+                                   self.cursor_query_param,
+                                   self.cursor(instance, reverse))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+
+class FeedPagination(UserPagination):
+    """Page number pagination with an opt-in keyset mode.
+
+    Keyset mode is enabled with 'paginate=cursor' or by passing a cursor.
+    """
+
+    mode_query_param = 'paginate'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if (request.query_params.get(self.mode_query_param) == 'cursor'
+                or self.keyset_class.cursor_query_param
+                in request.query_params):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,9 +1,67 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SerializerMethodField
 
 from users.models import Subscription, User
 from gen_ser.api.serializers import GenericRecipeSerializer
+from recipes.models import Recipe
+
+
+def get_subscribed_author_ids(request):
+    """Return ids of the authors followed by the user making the request.
+
+    The set is loaded once and kept on the request, so every nested
+    UserSerializer rendered during the request shares a single query.
+    """
+    if not hasattr(request, '_subscribed_author_ids'):
+        request._subscribed_author_ids = set(
+            Subscription.objects.filter(
+                subscriber=request.user
+            ).values_list('author_id', flat=True)
+        )
+    return request._subscribed_author_ids
+
+
+def get_recipes_limit(request):
+    """Return the recipes_limit query parameter or None if it is invalid."""
+    try:
+        recipes_limit = int(request.query_params.get('recipes_limit', ''))
+    except ValueError:
+        return None
+    return recipes_limit if recipes_limit >= 0 else None
+
+
+def get_latest_recipes(author_ids, limit=None):
+    """Return the newest recipes of the authors grouped by author id.
+
+    The recipes of all authors are read with a single query; the per-author
+    limit is applied by ROW_NUMBER() over the recipes of each author.
+    """
+    recipes = Recipe.objects.filter(author_id__in=author_ids).only(
+        'id', 'author_id', 'name', 'image', 'image_variants', 'cooking_time')
+    if limit is None:
+        recipes = recipes.order_by('author_id', '-date', '-id')
+    else:
+        ranked = recipes.order_by().annotate(recipe_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('date').desc(), F('id').desc()],
+        ))
+        sql, params = ranked.query.sql_with_params()
+        recipes = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) ranked WHERE recipe_rank <= %s '
+            'ORDER BY author_id, recipe_rank',
+            (*params, limit),
+        )
+    recipes_by_author = defaultdict(list)
+    for recipe in recipes:
+        recipes_by_author[recipe.author_id].append(recipe)
+    return recipes_by_author
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -14,10 +72,10 @@ class UserSerializer(serializers.ModelSerializer):
     def get_is_subscribed(self, obj):
         """Get the value indicating if the user is subscribed to the author."""
         request = self.context.get('request')
-        return (
+        return bool(
             request
             and request.user.is_authenticated
-            and obj.authors.filter(subscriber=request.user).exists()
+            and obj.id in get_subscribed_author_ids(request)
         )
 
     class Meta:
@@ -32,7 +90,6 @@ class SubscribeUserSerializer(UserSerializer):
     """Serializer for user subscriptions."""
 
     recipes = SerializerMethodField()
-    recipes_count = SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
         fields = ('username', 'email', 'first_name',
@@ -42,45 +99,43 @@ class SubscribeUserSerializer(UserSerializer):
 
     def get_recipes(self, obj):
         """Get the recipes of the author."""
-        recipes = obj.recipes.all()
-        request = self.context['request']
-        recipes_limit = request.GET.get('recipes_limit')
-        if recipes_limit:
-            try:
-                recipes = recipes[:int(recipes_limit)]
-            except ValueError:
-                pass
-
-        return GenericRecipeSerializer(recipes, many=True,
+        recipes_by_author = self.context.get('recipes_by_author')
+        if recipes_by_author is None:
+            recipes_by_author = get_latest_recipes(
+                (obj.id,), get_recipes_limit(self.context['request']))
+        return GenericRecipeSerializer(recipes_by_author[obj.id], many=True,
                                        read_only=True,
                                        context=self.context).data
 
-    def get_recipes_count(self, obj):
-        """Get the count of recipes by the author."""
-        return obj.recipes.count()
-
 
 class PostSubscribeSerializer(serializers.ModelSerializer):
     """Serializer for creating subscriptions."""
 
+    subscriber = serializers.HiddenField(
+        default=serializers.CurrentUserDefault())
+
     class Meta:
         model = Subscription
         fields = ('author', 'subscriber')
 
     def validate(self, data):
-        author = data.get('author')
-        subscriber = data.get('subscriber')
-        if subscriber.followers.filter(author=author).exists():
+        if data['subscriber'] == data['author']:
             raise ValidationError(
-                detail='You cannot subscribe twice',
+                detail='You cannot subscribe to yourself',
                 code=status.HTTP_400_BAD_REQUEST,
             )
-        if subscriber == author:
+        return data
+
+    def create(self, validated_data):
+        """Insert the subscription, relying on the unique constraint."""
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
             raise ValidationError(
-                detail='You cannot subscribe to yourself',
+                detail='You cannot subscribe twice',
                 code=status.HTTP_400_BAD_REQUEST,
             )
-        return data
 
     def to_representation(self, instance):
         return SubscribeUserSerializer(
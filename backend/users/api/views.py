@@ -4,11 +4,13 @@ from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from users.api.pagination import UserPagination
+from users.api.filters import StableOrderingFilter
+from users.api.pagination import FeedPagination
 from users.api.permissions import AuthorOrReadOnly
 from users.api.serializers import (UserSerializer,
                                    PostSubscribeSerializer,
-                                   SubscribeUserSerializer)
+                                   SubscribeUserSerializer,
+                                   get_latest_recipes, get_recipes_limit)
 from users.models import Subscription, User
 
 
@@ -17,7 +19,10 @@ class UserViewSet(UserViewSet):
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    pagination_class = UserPagination
+    pagination_class = FeedPagination
+    cursor_ordering = ('-date_joined', '-id')
+    filter_backends = (StableOrderingFilter,)
+    ordering_fields = ('recipes_count', 'followers_count')
     permission_classes = (AuthorOrReadOnly,)
 
     def get_permissions(self):
@@ -32,10 +37,14 @@ class UserViewSet(UserViewSet):
             detail=False,)
     def subscriptions(self, request):
         """All user subscriptions."""
-        page = self.paginate_queryset(User.objects.filter(
-            authors__subscriber=request.user))
-        serializer = SubscribeUserSerializer(page, many=True,
-                                             context={'request': request})
+        page = self.paginate_queryset(self.filter_queryset(
+            User.objects.filter(authors__subscriber=request.user)))
+        recipes_by_author = get_latest_recipes(
+            [author.id for author in page], get_recipes_limit(request))
+        serializer = SubscribeUserSerializer(
+            page, many=True,
+            context={'request': request,
+                     'recipes_by_author': recipes_by_author})
         return self.get_paginated_response(serializer.data)
 
     @action(methods=['post'],
@@ -43,8 +52,7 @@ class UserViewSet(UserViewSet):
             detail=True)
     def subscribe(self, request, id):
         """Subscribe to an author."""
-        subscriber = request.user
-        data = {'subscriber': subscriber.id, 'author': id}
+        data = {'author': id}
         serializer = PostSubscribeSerializer(data=data,
                                              context={'request': request})
         serializer.is_valid(raise_exception=True)
@@ -54,10 +62,9 @@ class UserViewSet(UserViewSet):
     @subscribe.mapping.delete
     def subscribe_delete(self, request, id):
         """Unsubscribe from an author."""
-        data = Subscription.objects.filter(subscriber_id=request.user.id,
-                                           author_id=id)
-        if data.exists():
-            data.delete()
+        deleted, _ = Subscription.objects.filter(
+            subscriber_id=request.user.id, author_id=id).delete()
+        if deleted:
             return Response({'You have unsubscribed from the author'},
                             status=status.HTTP_204_NO_CONTENT)
         return Response({'Invalid data'},
@@ -6,11 +6,36 @@ from django.db import models
 from constants import MAX_LENGTH_NAME, MAX_LENGTH_EMAIL
 
 
-class User(AbstractUser):
+class ManagedFieldsMixin:
+    """Keep managed fields out of the UPDATE of full saves.
+
+    Managed fields, such as counters, only change through queryset updates,
+    so saving an instance loaded before such an update must not write its
+    stale values back. Saves of existing rows without update_fields write
+    every loaded field except the managed ones.
+    """
+
+    managed_fields = ()
+
+    def save(self, force_insert=False, force_update=False, using=None,
+             update_fields=None):
+        if update_fields is None and not force_insert and not (
+                self._state.adding):
+            skipped = set(self.managed_fields) | self.get_deferred_fields()
+            update_fields = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+                and field.attname not in skipped
+            ]
+        super().save(force_insert, force_update, using, update_fields)
+
+
+class User(ManagedFieldsMixin, AbstractUser):
     """User model."""
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')
+    managed_fields = ('recipes_count', 'followers_count')
 
     username = models.CharField(
         verbose_name='Username',
@@ -31,6 +56,16 @@ class User(AbstractUser):
         unique=True,
         max_length=MAX_LENGTH_EMAIL,
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Recipes Count',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Followers Count',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'User'
@@ -66,6 +101,10 @@ class Subscription(models.Model):
                 name='author_subscriber'
             )
         ]
+        indexes = [
+            models.Index(fields=['subscriber', 'author'],
+                         name='subscriber_author_idx'),
+        ]
 
     def clean(self):
         if self.subscriber == self.author: